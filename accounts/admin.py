@@ -7,3 +7,14 @@ class UserAdmin(admin.ModelAdmin):
     list_filter = ('role', 'is_active')
     search_fields = ('username', 'email')
     ordering = ('-date_joined',)
+    list_select_related = False
+    list_per_page = 50
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        # Only the changelist; the change form needs every column
+        match = getattr(request, "resolver_match", None)
+        if match and match.url_name == "accounts_user_changelist":
+            qs = qs.only('id', 'email', 'role', 'is_active', 'date_joined')
+        return qs
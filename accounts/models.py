@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
 class UserManager(BaseUserManager):
@@ -14,6 +15,10 @@ class UserManager(BaseUserManager):
         user.save(using=self._db)
         return user
 
+    def get_by_email(self, email):
+        """Case-insensitive lookup (served by user_email_upper_idx); None if no match."""
+        return self.filter(email__iexact=email).first()
+
     def create_user(self, email, password=None, **extra_fields):
         extra_fields.setdefault('is_staff', False)
         extra_fields.setdefault('is_superuser', False)
@@ -53,5 +58,11 @@ class User(AbstractUser):
 
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # email__iexact compiles to UPPER(email) = UPPER(%s) on Postgres
+            models.Index(Upper("email"), name="user_email_upper_idx"),
+        ]
+
     def __str__(self):
         return self.email
@@ -1,10 +1,26 @@
+import copy
+
 from rest_framework import serializers
 from .models import User
-from assessments.models import Score, UserSubscription
+from assessments.models import UserSubscription
+
+
+# ✅ Reuse the ModelSerializer field set instead of rebuilding it from Meta per instance
+class CachedFieldsMixin:
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = type(self)
+        cached = CachedFieldsMixin._fields_cache.get(cls)
+        if cached is None:
+            cached = super().get_fields()
+            CachedFieldsMixin._fields_cache[cls] = cached
+        # Fresh copies per instance; DRF binds them in Serializer.fields
+        return {name: copy.deepcopy(field) for name, field in cached.items()}
 
 
 # ✅ Serializer for user registration
-class RegisterUserSerializer(serializers.ModelSerializer):
+class RegisterUserSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
 
     class Meta:
@@ -30,7 +46,10 @@ class RegisterUserSerializer(serializers.ModelSerializer):
 
 
 # ✅ Candidate listing with trait scores (for Admin dashboard)
-class CandidateScoreSerializer(serializers.ModelSerializer):
+# Pass users prefetched with
+#   Prefetch("score_set", queryset=Score.objects.all(), to_attr="prefetched_scores")
+# so trait scores don't cost one query per user.
+class CandidateScoreSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     trait_scores = serializers.SerializerMethodField()
 
     class Meta:
@@ -49,12 +68,14 @@ class CandidateScoreSerializer(serializers.ModelSerializer):
         ]
 
     def get_trait_scores(self, user):
-        scores = Score.objects.filter(user=user)
+        scores = getattr(user, "prefetched_scores", None)
+        if scores is None:
+            scores = user.score_set.all()
         return {s.trait: s.score for s in scores}
 
 
 # ✅ Subscription mini serializer
-class SubscriptionMiniSerializer(serializers.ModelSerializer):
+class SubscriptionMiniSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     plan = serializers.SerializerMethodField()
 
     class Meta:
@@ -68,7 +89,7 @@ class SubscriptionMiniSerializer(serializers.ModelSerializer):
 
 
 # ✅ Profile serializer (fix: compute subscription from UserSubscription)
-class ProfileSerializer(serializers.ModelSerializer):
+class ProfileSerializer(CachedFieldsMixin, serializers.ModelSerializer):
     subscription = serializers.SerializerMethodField()
 
     class Meta:
@@ -88,5 +109,6 @@ class ProfileSerializer(serializers.ModelSerializer):
         ]
 
     def get_subscription(self, user):
-        sub = UserSubscription.objects.filter(user=user).first()
+        # Reads the reverse OneToOne; callers should select_related("subscription__plan")
+        sub = getattr(user, "subscription", None)
         return SubscriptionMiniSerializer(sub).data if sub else None
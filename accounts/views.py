@@ -2,23 +2,29 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.contrib.auth import authenticate
+from django.db.models import Prefetch
 
 # Email + cache utils for verification codes
-from django.core.mail import send_mail
 from django.core.cache import cache
 from django.conf import settings
-import random
+import hmac
+import logging
 import re
+import secrets
+import time
 
+from protopia_backend.mail import send_mail_async
+from protopia_backend.renderers import dumps as json_dumps
 from .models import User
 from .serializers import RegisterUserSerializer, ProfileSerializer
-from assessments.models import Score, FinalScore
+from assessments.models import Score
 
 # Stripe webhook imports
 from django.views.decorators.csrf import csrf_exempt
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 try:
     import stripe
+    from protopia_backend.stripe_events import construct_event
 except ImportError:
     stripe = None
 
@@ -27,6 +33,17 @@ if stripe:
     stripe.api_key = getattr(settings, "STRIPE_SECRET_KEY", "")
 
 
+logger = logging.getLogger(__name__)
+
+# Resolved once; settings don't change at runtime
+_FROM_EMAIL = getattr(settings, "DEFAULT_FROM_EMAIL", None) or getattr(settings, "EMAIL_HOST_USER", None)
+
+
+def _send_mail_async(subject, message, from_email, recipients, on_failure=None):
+    """Send in the background so the request doesn't wait on SMTP."""
+    send_mail_async(subject, message, from_email, recipients, on_failure)
+
+
 # =========================
 # Accounts / Admin
 # =========================
@@ -39,7 +56,7 @@ def register_user(request):
     if serializer.is_valid():
         serializer.save()
         return Response({"message": "User registered successfully."}, status=201)
-    print("❌ Registration Validation Errors:", serializer.errors)
+    logger.info("Registration validation errors: %s", serializer.errors)
     return Response(serializer.errors, status=400)
 
 
@@ -47,10 +64,35 @@ def register_user(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def user_profile(request):
-    serializer = ProfileSerializer(request.user)
+    user = User.objects.select_related("subscription__plan").get(pk=request.user.pk)
+    serializer = ProfileSerializer(user)
     return Response(serializer.data)
 
 
+def _clamp(x, _lo=0.5, _hi=5.0, _round=round):
+    return _round(_lo if x < _lo else _hi if x > _hi else x, 2)
+
+
+def _clamp_scores(values):
+    return [_clamp(v) for v in values]
+
+
+def _candidate_trait_scores(c):
+    """MCQ scores, overridden by FinalScore mcq/essay values, each clamped to 0.5–5.0."""
+    scores = c.prefetched_scores
+    trait_scores = dict(zip([s.trait for s in scores], _clamp_scores([s.score for s in scores])))
+
+    final = getattr(c, "finalscore", None)
+    if final and final.top_traits:
+        details = final.top_traits
+        mcq = _clamp_scores([d["mcq_score"] for d in details.values()])
+        essay = _clamp_scores([d["essay_score"] for d in details.values()])
+        for trait, m, e in zip(details, mcq, essay):
+            trait_scores[trait] = m
+            trait_scores[f"{trait}_essay"] = e
+    return trait_scores
+
+
 # ✅ Admin: list all candidates + their scores
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
@@ -58,13 +100,24 @@ def admin_candidate_list(request):
     if request.user.role != "admin":
         return Response({"detail": "Access denied."}, status=403)
 
-    candidates = User.objects.filter(role="candidate")
-    results = []
-    for c in candidates:
-        scores = Score.objects.filter(user=c)
-        final = FinalScore.objects.filter(user=c).first()
-
-        result = {
+    # One query for candidates (+ their OneToOne FinalScore) and one for all scores
+    candidates = (
+        User.objects.filter(role="candidate")
+        .select_related("finalscore")
+        .only(
+            "id", "first_name", "last_name", "email", "profession",
+            "gender", "age_range", "subscription_type", "finalscore__top_traits",
+        )
+        .prefetch_related(
+            Prefetch(
+                "score_set",
+                queryset=Score.objects.only("user_id", "trait", "score"),
+                to_attr="prefetched_scores",
+            )
+        )
+    )
+    rows = (
+        {
             "id": c.id,
             "first_name": c.first_name,
             "last_name": c.last_name,
@@ -73,20 +126,22 @@ def admin_candidate_list(request):
             "gender": c.gender,
             "age_range": c.age_range,
             "subscription_type": c.subscription_type,
-            "trait_scores": {}
+            "trait_scores": _candidate_trait_scores(c),
         }
+        for c in candidates.iterator(chunk_size=500)
+    )
 
-        for s in scores:
-            result["trait_scores"][s.trait] = round(min(max(s.score, 0.5), 5.0), 2)
-
-        if final:
-            for trait, detail in final.top_traits.items():
-                result["trait_scores"][trait] = round(min(max(detail["mcq_score"], 0.5), 5.0), 2)
-                result["trait_scores"][f"{trait}_essay"] = round(min(max(detail["essay_score"], 0.5), 5.0), 2)
+    # Encode row by row so memory stays O(chunk) instead of O(candidates)
+    return StreamingHttpResponse(_json_array_stream(rows), content_type="application/json")
 
-        results.append(result)
 
-    return Response(results)
+def _json_array_stream(rows):
+    yield b"["
+    sep = b""
+    for row in rows:
+        yield sep + json_dumps(row)
+        sep = b","
+    yield b"]"
 
 
 # ✅ Admin: delete candidate with password confirmation
@@ -100,18 +155,17 @@ def delete_user_with_password(request, user_id):
     if not password:
         return Response({"detail": "Password required."}, status=400)
 
-    admin = authenticate(email=request.user.email, password=password)
-    if not admin:
+    # request.user is already loaded; no need for authenticate() to look it up again
+    if not request.user.check_password(password):
         return Response({"detail": "Invalid password."}, status=401)
 
-    try:
-        user = User.objects.get(id=user_id)
-        if user.role == "admin":
-            return Response({"detail": "Cannot delete another admin."}, status=403)
-        user.delete()
-        return Response({"message": "User deleted successfully."}, status=200)
-    except User.DoesNotExist:
+    user = User.objects.only("id", "role").filter(pk=user_id).first()
+    if user is None:
         return Response({"detail": "User not found."}, status=404)
+    if user.role == "admin":
+        return Response({"detail": "Cannot delete another admin."}, status=403)
+    user.delete()
+    return Response({"message": "User deleted successfully."}, status=200)
 
 
 # =========================
@@ -120,7 +174,15 @@ def delete_user_with_password(request, user_id):
 
 EMAIL_CODE_TTL_SECONDS = 10 * 60   # 10 minutes
 RESEND_COOLDOWN_SECONDS = 60       # 60s cooldown
-EMAIL_REGEX = re.compile(r"^\S+@\S+\.\S+$")
+EMAIL_REGEX = re.compile(r"\A[^\s@]+@[^\s@]+\.[^\s@]+\Z")
+
+
+def _clean_email(raw):
+    """Returns (stripped, lowercased) or (None, None) if invalid."""
+    email_raw = (raw or "").strip()
+    if not EMAIL_REGEX.match(email_raw):
+        return None, None
+    return email_raw, email_raw.lower()
 
 
 def _code_cache_key(email: str) -> str:
@@ -132,7 +194,20 @@ def _cooldown_key(email: str) -> str:
 
 
 def _generate_code() -> str:
-    return f"{random.randint(0, 999999):06d}"
+    return f"{secrets.randbelow(1_000_000):06d}"
+
+
+def _store_code(code_key: str, cooldown_key: str, code: str) -> None:
+    # One cache round-trip: the cooldown key shares the code TTL and holds its own expiry
+    cache.set_many(
+        {code_key: code, cooldown_key: time.time() + RESEND_COOLDOWN_SECONDS},
+        timeout=EMAIL_CODE_TTL_SECONDS,
+    )
+
+
+def _in_cooldown(cooldown_key: str) -> bool:
+    until = cache.get(cooldown_key)
+    return isinstance(until, float) and until > time.time()
 
 
 @api_view(["POST"])
@@ -142,27 +217,22 @@ def send_code(request):
     POST { "email": "user@example.com" }
     Sends a 6-digit code to the email and stores it in cache for 10 minutes.
     """
-    email_raw = (request.data.get("email") or "").strip()
-    if not EMAIL_REGEX.match(email_raw):
+    email_raw, email = _clean_email(request.data.get("email"))
+    if email is None:
         return Response({"detail": "Invalid email."}, status=400)
 
-    email = email_raw.lower()
-
-    if cache.get(_cooldown_key(email)):
+    if _in_cooldown(_cooldown_key(email)):
         return Response({"detail": "Please wait before requesting a new code."}, status=429)
 
     code = _generate_code()
-    cache.set(_code_cache_key(email), code, timeout=EMAIL_CODE_TTL_SECONDS)
-    cache.set(_cooldown_key(email), True, timeout=RESEND_COOLDOWN_SECONDS)
+    _store_code(_code_cache_key(email), _cooldown_key(email), code)
 
     subject = "Your Protopia verification code"
     message = f"Your verification code is: {code}\n\nIt expires in 10 minutes."
-    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", getattr(settings, "EMAIL_HOST_USER", None))
 
-    try:
-        send_mail(subject, message, from_email, [email_raw], fail_silently=False)
-    except Exception as e:
-        return Response({"detail": f"Failed to send email: {e}"}, status=500)
+    # the response can't report a failed send any more; at least don't charge the cooldown for it
+    cooldown_key = _cooldown_key(email)
+    _send_mail_async(subject, message, _FROM_EMAIL, [email_raw], on_failure=lambda: cache.delete(cooldown_key))
 
     return Response({"sent": True}, status=200)
 
@@ -174,19 +244,17 @@ def verify_code(request):
     POST { "email": "user@example.com", "code": "123456" }
     Verifies the 6-digit code stored in cache.
     """
-    email_raw = (request.data.get("email") or "").strip()
+    _, email = _clean_email(request.data.get("email"))
     code = (request.data.get("code") or "").strip()
 
-    if not EMAIL_REGEX.match(email_raw) or len(code) != 6 or not code.isdigit():
+    if email is None or len(code) != 6 or not code.isdigit():
         return Response({"detail": "Invalid email or code."}, status=400)
 
-    email = email_raw.lower()
-
     stored = cache.get(_code_cache_key(email))
     if stored is None:
         return Response({"verified": False, "detail": "Code expired or not found."}, status=400)
 
-    if code != stored:
+    if not hmac.compare_digest(code, stored):
         return Response({"verified": False, "detail": "Incorrect code."}, status=400)
 
     cache.delete(_code_cache_key(email))
@@ -213,30 +281,24 @@ def password_send_code(request):
     Sends a 6-digit password reset code to the email (valid 10 minutes).
     Requires that the email already exists in the system.
     """
-    email_raw = (request.data.get("email") or "").strip()
-    if not EMAIL_REGEX.match(email_raw):
+    email_raw, email = _clean_email(request.data.get("email"))
+    if email is None:
         return Response({"detail": "Invalid email."}, status=400)
 
-    email = email_raw.lower()
-
     if not User.objects.filter(email__iexact=email).exists():
         return Response({"detail": "No user found with this email."}, status=404)
 
-    if cache.get(_reset_cooldown_key(email)):
+    if _in_cooldown(_reset_cooldown_key(email)):
         return Response({"detail": "Please wait before requesting a new code."}, status=429)
 
     code = _generate_code()
-    cache.set(_reset_cache_key(email), code, timeout=EMAIL_CODE_TTL_SECONDS)
-    cache.set(_reset_cooldown_key(email), True, timeout=RESEND_COOLDOWN_SECONDS)
+    _store_code(_reset_cache_key(email), _reset_cooldown_key(email), code)
 
     subject = "Your Protopia password reset code"
     message = f"Your password reset code is: {code}\n\nIt expires in 10 minutes."
-    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", getattr(settings, "EMAIL_HOST_USER", None))
 
-    try:
-        send_mail(subject, message, from_email, [email_raw], fail_silently=False)
-    except Exception as e:
-        return Response({"detail": f"Failed to send email: {e}"}, status=500)
+    cooldown_key = _reset_cooldown_key(email)
+    _send_mail_async(subject, message, _FROM_EMAIL, [email_raw], on_failure=lambda: cache.delete(cooldown_key))
 
     return Response({"sent": True}, status=200)
 
@@ -248,24 +310,22 @@ def password_reset(request):
     POST { "email": "user@example.com", "code": "123456", "new_password": "secret123" }
     Verifies the code and updates the user's password.
     """
-    email_raw = (request.data.get("email") or "").strip()
+    _, email = _clean_email(request.data.get("email"))
     code = (request.data.get("code") or "").strip()
     new_password = (request.data.get("new_password") or "").strip()
 
-    if not EMAIL_REGEX.match(email_raw) or len(code) != 6 or not code.isdigit():
+    if email is None or len(code) != 6 or not code.isdigit():
         return Response({"detail": "Invalid email or code."}, status=400)
     if len(new_password) < 6:
         return Response({"detail": "Password must be at least 6 characters."}, status=400)
 
-    email = email_raw.lower()
-
     stored = cache.get(_reset_cache_key(email))
     if stored is None:
         return Response({"reset": False, "detail": "Code expired or not found."}, status=400)
-    if code != stored:
+    if not hmac.compare_digest(code, stored):
         return Response({"reset": False, "detail": "Incorrect code."}, status=400)
 
-    user = User.objects.filter(email__iexact=email).first()
+    user = User.objects.get_by_email(email)
     if not user:
         return Response({"reset": False, "detail": "No account found with this email."}, status=404)
 
@@ -297,6 +357,22 @@ def password_reset(request):
 # Stripe Webhook (Invoice Email)
 # =========================
 
+STRIPE_CUSTOMER_EMAIL_TTL_SECONDS = 24 * 60 * 60
+
+
+def _stripe_customer_email(customer_id: str):
+    """Customer email from Stripe, cached for a day ("" cached for customers without one)."""
+    key = f"stripe:cust_email:{customer_id}"
+    email = cache.get(key)
+    if email is None:
+        try:
+            email = stripe.Customer.retrieve(customer_id).get("email") or ""
+        except Exception:
+            return None  # don't cache transient API failures
+        cache.set(key, email, timeout=STRIPE_CUSTOMER_EMAIL_TTL_SECONDS)
+    return email or None
+
+
 @csrf_exempt
 @api_view(["POST"])
 @permission_classes([AllowAny])
@@ -304,6 +380,7 @@ def stripe_webhook(request):
     """
     Handles Stripe events and emails tax invoices after successful payment.
     Event(s): invoice.payment_succeeded (subscription invoices incl. first payment)
+    Enable only that event on the Stripe endpoint so others aren't delivered at all.
     """
     if stripe is None:
         return HttpResponse("Stripe not installed", status=501)
@@ -316,54 +393,45 @@ def stripe_webhook(request):
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE", "")
 
     try:
-        event = stripe.Webhook.construct_event(
-            payload=payload,
-            sig_header=sig_header,
-            secret=endpoint_secret,
-        )
+        event = construct_event(payload, sig_header, endpoint_secret)
     except ValueError:
         return HttpResponse(status=400)
     except stripe.error.SignatureVerificationError:
         return HttpResponse(status=400)
 
-    if event.get("type") == "invoice.payment_succeeded":
-        invoice = event["data"]["object"]  # type: ignore
-
-        customer_email = invoice.get("customer_email")
-        if not customer_email and invoice.get("customer"):
-            try:
-                cust = stripe.Customer.retrieve(invoice["customer"])
-                customer_email = cust.get("email")
-            except Exception:
-                customer_email = None
-
-        if customer_email:
-            number = invoice.get("number") or ""
-            amount = (invoice.get("total") or 0) / 100.0
-            currency = (invoice.get("currency") or "usd").upper()
-            hosted_url = invoice.get("hosted_invoice_url") or ""
-            pdf_url = invoice.get("invoice_pdf") or ""
-            status = invoice.get("status") or "paid"
-
-            subject = f"Your Protopia Tax Invoice {number}".strip()
-            body = (
-                "Hi,\n\n"
-                "Thank you for your subscription payment to Protopia.\n\n"
-                f"Invoice number: {number or '—'}\n"
-                f"Amount paid: {amount:.2f} {currency}\n"
-                f"Status: {status}\n\n"
-                "View your invoice online:\n"
-                f"{hosted_url}\n\n"
-                "Download the PDF:\n"
-                f"{pdf_url}\n\n"
-                "If you have any questions, reply to this email.\n\n"
-                "— Protopia"
-            )
+    # Only invoice.payment_succeeded is handled; ack everything else right away
+    if event.get("type") != "invoice.payment_succeeded":
+        return HttpResponse(status=200)
+
+    invoice = event["data"]["object"]  # type: ignore
+
+    customer_email = invoice.get("customer_email")
+    if not customer_email and invoice.get("customer"):
+        customer_email = _stripe_customer_email(invoice["customer"])
+
+    if customer_email:
+        number = invoice.get("number") or ""
+        amount = (invoice.get("total") or 0) / 100.0
+        currency = (invoice.get("currency") or "usd").upper()
+        hosted_url = invoice.get("hosted_invoice_url") or ""
+        pdf_url = invoice.get("invoice_pdf") or ""
+        status = invoice.get("status") or "paid"
+
+        subject = f"Your Protopia Tax Invoice {number}".strip()
+        body = (
+            "Hi,\n\n"
+            "Thank you for your subscription payment to Protopia.\n\n"
+            f"Invoice number: {number or '—'}\n"
+            f"Amount paid: {amount:.2f} {currency}\n"
+            f"Status: {status}\n\n"
+            "View your invoice online:\n"
+            f"{hosted_url}\n\n"
+            "Download the PDF:\n"
+            f"{pdf_url}\n\n"
+            "If you have any questions, reply to this email.\n\n"
+            "— Protopia"
+        )
 
-            from_email = getattr(settings, "DEFAULT_FROM_EMAIL", getattr(settings, "EMAIL_HOST_USER", None))
-            try:
-                send_mail(subject, body, from_email, [customer_email], fail_silently=False)
-            except Exception as e:
-                print("Invoice email send error:", e)
+        _send_mail_async(subject, body, _FROM_EMAIL, [customer_email])
 
     return HttpResponse(status=200)
@@ -1,6 +1,11 @@
 import re
+import hashlib
+import threading
+from collections import Counter, OrderedDict
 import numpy as np
 
+from protopia_backend.inference import quantize_linear
+
 # --- Optional deps: guard for environments where transformers/torch may be missing
 try:
     from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
@@ -15,21 +20,39 @@ except Exception:  # pragma: no cover
     BertTokenizer = None
     BertModel = None
 
+try:
+    from numba import njit
+except Exception:  # pragma: no cover
+    njit = None
+
 
 # =========================
 # Model init (lazy + robust)
 # =========================
-_vader = SentimentIntensityAnalyzer() if SentimentIntensityAnalyzer else None
+_vader = None
 _tokenizer = None
 _bert = None
+# essay analyses run on background threads; only the first to arrive loads bert-base
+_bert_lock = threading.Lock()
+
+def _get_vader():
+    """Build the VADER analyzer (lexicon load) on first use, then reuse it."""
+    global _vader
+    if _vader is None and SentimentIntensityAnalyzer is not None:
+        _vader = SentimentIntensityAnalyzer()
+    return _vader
 
 def _load_bert():
     global _tokenizer, _bert
-    if _tokenizer is None or _bert is None:
-        if BertTokenizer is None or BertModel is None:
-            return False
-        _tokenizer = BertTokenizer.from_pretrained("bert-base-uncased")
-        _bert = BertModel.from_pretrained("bert-base-uncased")
+    if BertTokenizer is None or BertModel is None:
+        return False
+    if _bert is not None:
+        return True
+    with _bert_lock:
+        if _bert is None:
+            _tokenizer = BertTokenizer.from_pretrained("bert-base-uncased")
+            # publish the model last: readers check _bert without the lock
+            _bert = quantize_linear(BertModel.from_pretrained("bert-base-uncased").eval())
     return True
 
 
@@ -66,17 +89,26 @@ _AI_PHRASES = [
 
 _FILLERS = {"um","uh","erm","like","basically","actually","literally","you know","sort of","kind of"}
 
-_WORD_RE = re.compile(r"[a-z']+", re.I)
+# Callers lowercase first, so no IGNORECASE needed
+_WORD_RE = re.compile(r"[a-z']+")
+_words_lower = _WORD_RE.findall  # tokens of already-lowercased text
 
 def _words(text: str):
-    return _WORD_RE.findall(text.lower())
+    return _words_lower(text.lower())
 
 def lexical_diversity(text: str) -> float:
-    w = _words(text)
-    return len(set(w)) / max(len(w), 1)
+    # Stream matches straight into the set; no intermediate word list
+    uniq = set()
+    total = 0
+    for m in _WORD_RE.finditer(text.lower()):
+        uniq.add(m.group())
+        total += 1
+    return len(uniq) / max(total, 1)
 
 def looks_ai_generated(text: str) -> bool:
-    tl = text.lower()
+    return _has_ai_phrase(text.lower())
+
+def _has_ai_phrase(tl: str) -> bool:
     return any(p in tl for p in _AI_PHRASES)
 
 def _max_repeat_run(words):
@@ -93,54 +125,228 @@ def _repetitiveness_ratio(words, n=2):
     """Max frequency of top n-gram normalized by total n-grams."""
     if len(words) < n:
         return 0.0
-    counts = {}
-    for i in range(len(words)-n+1):
-        g = tuple(words[i:i+n])
-        counts[g] = counts.get(g, 0) + 1
-    max_count = max(counts.values()) if counts else 0
+    counts = Counter(zip(*(words[i:] for i in range(n))))
+    max_count = counts.most_common(1)[0][1]
     total = max(len(words)-n+1, 1)
     return max_count / total
 
-def _filler_ratio(text):
-    tl = " " + text.lower() + " "
-    count = 0
-    for f in _FILTERS_LIST:  # populated below
-        count += tl.count(" " + f + " ")
+def _repetitiveness_ratios(words):
+    """(bigram, trigram) repetitiveness; same values as _repetitiveness_ratio(words, 2/3)."""
+    n = len(words)
+    if n < 2:
+        return 0.0, 0.0
+    # Share the shifted views; Counter(zip(...)) keeps the counting loop in C
+    w1 = words[1:]
+    bi = max(Counter(zip(words, w1)).values()) / (n - 1)
+    if n < 3:
+        return bi, 0.0
+    tri = max(Counter(zip(words, w1, words[2:])).values()) / (n - 2)
+    return bi, tri
+
+def _token_ids(word_lists):
+    """Intern tokens across essays into int32 id arrays; returns (arrays, vocab size)."""
+    vocab = {}
+    intern = vocab.setdefault
+    arrays = [
+        np.fromiter((intern(w, len(vocab)) for w in words), dtype=np.int32, count=len(words))
+        for words in word_lists
+    ]
+    return arrays, len(vocab)
+
+def _max_run_sorted(keys):
+    """Longest run of equal values in a sorted, non-empty array."""
+    best = cur = 1
+    for i in range(1, keys.size):
+        if keys[i] == keys[i - 1]:
+            cur += 1
+            if cur > best:
+                best = cur
+        else:
+            cur = 1
+    return best
+
+def _essay_metrics(ids, vocab_size):
+    """(uniq_ratio, repeat_run, bigram_rep, trigram_rep) for one essay's token ids.
+
+    Same values as the Counter-based helpers; n-grams are packed into int64 keys
+    and counted by sorting, which keeps the whole thing in nopython mode.
+    """
+    n = ids.size
+    if n == 0:
+        return 0.0, 0, 0.0, 0.0
+
+    run = best = 1
+    for i in range(1, n):
+        if ids[i] == ids[i - 1]:
+            run += 1
+            if run > best:
+                best = run
+        else:
+            run = 1
+
+    srt = np.sort(ids)
+    uniq = 1
+    for i in range(1, n):
+        if srt[i] != srt[i - 1]:
+            uniq += 1
+    uniq_ratio = uniq / n
+
+    if n < 2:
+        return uniq_ratio, best, 0.0, 0.0
+    v = np.int64(vocab_size)
+    bi_keys = ids[:-1].astype(np.int64) * v + ids[1:]
+    bi = _max_run_sorted(np.sort(bi_keys)) / (n - 1)
+    if n < 3:
+        return uniq_ratio, best, bi, 0.0
+    # (a*V + b)*V + c fits int64 for any vocabulary under ~2M distinct words
+    tri_keys = bi_keys[:-1] * v + ids[2:]
+    tri = _max_run_sorted(np.sort(tri_keys)) / (n - 2)
+    return uniq_ratio, best, bi, tri
+
+if njit is not None:
+    _max_run_sorted = njit(cache=True)(_max_run_sorted)
+    _essay_kernel = njit(cache=True)(_essay_metrics)
+else:  # pragma: no cover
+    _essay_kernel = None
+
+def _vr_metrics(text):
+    """(n, uniq_ratio, repeat_run, bigram_rep, trigram_rep) from one tokenization of text."""
     words = _words(text)
-    return count / max(len(words), 1)
+    n = len(words)
+    if _essay_kernel is not None:
+        (ids,), vocab_size = _token_ids([words])
+        uniq_ratio, repeat_run, bi_rep, tri_rep = _essay_kernel(ids, vocab_size)
+        return n, uniq_ratio, repeat_run, bi_rep, tri_rep
+    uniq_ratio = (len(set(words)) / n) if n else 0.0
+    bi_rep, tri_rep = _repetitiveness_ratios(words)
+    return n, uniq_ratio, _max_repeat_run(words), bi_rep, tri_rep
 
 _FILTERS_LIST = list(_FILLERS)
 
+# Space-delimited filler occurrences in one scan (lookarounds let adjacent fillers share a space)
+_FILLER_RE = re.compile(
+    r"(?<= )(?:" + "|".join(map(re.escape, sorted(_FILTERS_LIST, key=len, reverse=True))) + r")(?= )"
+)
+
+def _filler_ratio(text):
+    tl = text.lower()
+    count = len(_FILLER_RE.findall(" " + tl + " "))
+    return count / max(len(_words_lower(tl)), 1)
+
 def _vader_sentiment(text):
-    if not _vader:
+    vader = _get_vader()
+    if not vader:
         return 0.0
-    return float(_vader.polarity_scores(text)["compound"])
+    return float(vader.polarity_scores(text)["compound"])
+
+def _vader_sentiments(texts):
+    """Compound VADER scores for all texts as one float64 array (zeros if VADER missing)."""
+    vader = _get_vader()
+    if not vader:
+        return np.zeros(len(texts), dtype=np.float64)
+    polarity = vader.polarity_scores
+    return np.fromiter((polarity(t)["compound"] for t in texts), dtype=np.float64, count=len(texts))
+
+# Embeddings are deterministic for fixed weights; keep recent ones keyed by text hash
+_EMB_CACHE_MAX = 4096
+_emb_cache = OrderedDict()
+_emb_lock = threading.Lock()
+
+def _text_key(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+def _embeddings(texts):
+    """Mean-pooled BERT embeddings for a batch of texts, shape (N, hidden); None if unavailable."""
+    if not _load_bert():
+        return None
+    keys = [_text_key(t) for t in texts]
+    found = {}
+    with _emb_lock:
+        for k in keys:
+            if k in _emb_cache:
+                _emb_cache.move_to_end(k)
+                found[k] = _emb_cache[k]
+
+    # Only run the model on texts we haven't seen (deduplicated within the batch too)
+    pending = {}
+    for k, t in zip(keys, texts):
+        if k not in found:
+            pending.setdefault(k, t)
+    if pending:
+        fresh = _embed_batch(list(pending.values()))
+        with _emb_lock:
+            for k, e in zip(pending, fresh):
+                found[k] = _emb_cache[k] = e
+            while len(_emb_cache) > _EMB_CACHE_MAX:
+                _emb_cache.popitem(last=False)
+    return np.stack([found[k] for k in keys])
+
+def _embed_batch(texts):
+    tokens = _tokenizer(texts, return_tensors="pt", truncation=True, max_length=512, padding=True)
+    with torch.inference_mode():
+        hidden = _bert(**tokens).last_hidden_state
+        # Pool over real tokens only so padding doesn't skew shorter essays
+        mask = tokens["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+    return pooled.cpu().numpy()
 
 def _embedding(text):
     """Mean-pooled BERT embedding (safe fallback if unavailable)."""
-    if not _load_bert():
-        return None
-    tokens = _tokenizer(text, return_tensors="pt", truncation=True, max_length=512, padding=True)
-    with torch.no_grad():
-        out = _bert(**tokens).last_hidden_state.mean(dim=1).squeeze()
-    return out.detach().cpu().numpy()
+    embs = _embeddings([text])
+    return None if embs is None else embs[0]
 
 def _semantic_flow(texts):
     """Average L2 distance between consecutive essay embeddings (authenticity proxy)."""
-    embs = []
-    for t in texts:
-        e = _embedding(t)
-        if e is None:
-            return 0.5  # neutral if BERT not available
-        embs.append(e)
-    if len(embs) < 2:
+    if len(texts) < 2:
         return 0.5
-    diffs = [np.linalg.norm(embs[i]-embs[i-1]) for i in range(1, len(embs))]
+    embs = _embeddings(texts)  # one tokenizer call + one forward pass for all essays
+    if embs is None:
+        return 0.5  # neutral if BERT not available
+    diffs = np.linalg.norm(embs[1:] - embs[:-1], axis=1)
     # Normalize by a loose scale so typical varied answers land ~0.6-0.9
     flow = float(np.mean(diffs))
     return min(max(flow / 5.0, 0.0), 1.0)
 
 
+# =========================
+# Trait weights
+# =========================
+# Every trait is a linear combination of
+#   [1, tone_mean, authenticity, uniq_mean, empathy, ethics]
+# where empathy/ethics are the already-rounded traits later rows build on.
+_TRAIT_KEYS = (
+    "empathy", "ethical_reasoning", "authenticity", "clarity", "critical_thinking",
+    "inclusiveness", "accountability", "vocabulary_richness", "tone_balance", "leadership_signal",
+)
+_TRAIT_W = np.array([
+    [0.5, 0.5, 0.0, 0.0, 0.0, 0.0],        # empathy = (tone_mean + 1) / 2
+    [0.0, 0.0, 0.5, 0.0, 0.5, 0.0],        # ethical_reasoning = (authenticity + empathy) / 2
+    [0.0, 0.0, 1.0, 0.0, 0.0, 0.0],        # authenticity (kept unrounded)
+    [0.0, 0.0, 0.0, 0.9, 0.0, 0.0],        # clarity = uniq_mean * 0.9
+    [0.0, 0.0, 0.0, 0.0, 0.0, 0.9],        # critical_thinking = ethics * 0.9
+    [1/3, 1/3, 0.0, 0.0, 1/3, 0.0],        # inclusiveness = (empathy + tone_mean + 1) / 3
+    [0.0, 0.0, 0.5, 0.0, 0.0, 0.5],        # accountability = (authenticity + ethics) / 2
+    [0.0, 0.0, 0.0, 1.0, 0.0, 0.0],        # vocabulary_richness = uniq_mean
+    [0.0, 1.0, 0.0, 0.0, 0.0, 0.0],        # tone_balance = tone_mean
+    [0.0, 0.0, 0.5, 0.0, 0.5, 0.0],        # leadership_signal = (authenticity + empathy) / 2
+])
+_TRAIT_ROUNDED = frozenset(_TRAIT_KEYS) - {"authenticity"}
+
+# Essay penalty weights, aligned with the flags built in analyze_essay
+_PENALTY_W = np.array([
+    0.35,  # mean length < 60 words
+    0.35,  # mean unique ratio < 0.50
+    0.40,  # same word 3+ times in a row
+    0.30,  # bigram > 0.35 or trigram > 0.25 repetition
+    0.15,  # filler ratio > 0.08
+    0.40,  # AI-ish phrasing in 2+ essays
+    0.20,  # AI-ish phrasing in exactly 1 essay
+    0.70,  # any paste detected
+    0.30,  # 2+ fast-but-long answers, or any very short answer
+    0.25,  # typing speed >= 180 wpm
+])
+
+
 # =========================
 # Summary comment (kept)
 # =========================
@@ -192,109 +398,106 @@ def analyze_essay(texts, times, paste_flags):
         }
 
     # ---------- Per-essay metrics
-    word_lists = [_words(t) for t in texts]
-    word_counts = [len(w) for w in word_lists]
-    uniq_ratios = [ (len(set(w)) / max(len(w),1)) for w in word_lists ]
-    repeat_runs = [ _max_repeat_run(w) for w in word_lists ]
-    bigram_rep = [ _repetitiveness_ratio(w, n=2) for w in word_lists ]
-    trigram_rep = [ _repetitiveness_ratio(w, n=3) for w in word_lists ]
+    # Lowercase once; every heuristic below reads `lowers` except VADER, which uses case
+    lowers = [t.lower() for t in texts]
+    word_lists = [_words_lower(tl) for tl in lowers]
+    word_counts = np.fromiter((len(w) for w in word_lists), dtype=np.int64, count=len(word_lists))
+    id_arrays, vocab_size = _token_ids(word_lists)
+    if _essay_kernel is not None:
+        # JIT path: one compiled pass per essay over its int32 ids
+        uniq_ratios, repeat_runs, bigram_rep, trigram_rep = zip(
+            *(_essay_kernel(a, vocab_size) for a in id_arrays)
+        )
+        uniq_ratios = np.array(uniq_ratios)
+    else:
+        uniq_ratios = np.array([np.unique(a).size / max(a.size, 1) for a in id_arrays])
+        repeat_runs = [ _max_repeat_run(w) for w in word_lists ]
+        bigram_rep, trigram_rep = zip(*(_repetitiveness_ratios(w) for w in word_lists))
     filler_ratios = []
-    for t in texts:
-        tl = t.lower()
-        filler_cnt = sum(tl.count(" " + f + " ") for f in _FILTERS_LIST)
-        filler_ratios.append(filler_cnt / max(len(_words(t)), 1))
-    ai_flags = sum(looks_ai_generated(t) for t in texts)
+    for tl, w in zip(lowers, word_lists):
+        filler_cnt = len(_FILLER_RE.findall(tl))
+        filler_ratios.append(filler_cnt / max(len(w), 1))
+    # Penalties only distinguish 0 / 1 / 2+ AI-ish essays, so stop counting at 2
+    ai_flags = 0
+    for tl in lowers:
+        if _has_ai_phrase(tl):
+            ai_flags += 1
+            if ai_flags >= 2:
+                break
     paste_count = sum(1 for p in paste_flags if p)
 
+    # Timing arrays pair up with essays like zip() did (extra entries ignored)
+    secs = np.asarray(times[:len(texts)], dtype=np.float64)
+    timed_counts = word_counts[:secs.size]
+
     # typing speed heuristic (words per minute) – very high suggests paste/automation
-    wpm = []
-    for n, sec in zip(word_counts, times):
-        if sec <= 0:
-            wpm.append(0.0)
-        else:
-            wpm.append( (n / max(sec,1)) * 60.0 )
+    wpm = np.where(secs > 0, timed_counts / np.maximum(secs, 1) * 60.0, 0.0)
 
     # Very short answers
-    very_short_flags = [n < 40 for n in word_counts]
-    very_short_any = any(very_short_flags)
+    very_short_any = bool((word_counts < 40).any())
 
     # Short time yet long content (suspicious)
-    short_time_flags = [ (sec < 20 and n >= 50) for sec, n in zip(times, word_counts) ]
-    short_time_count = sum(short_time_flags)
-
-    # Sentiment (tone)
-    comp_scores = [_vader_sentiment(t) for t in texts]
-    tone_mean = float(np.mean(comp_scores)) if comp_scores else 0.0
+    short_time_count = int(((secs < 20) & (timed_counts >= 50)).sum())
+
+    # Core indicators aggregated across essays: one (7, N) matrix, one mean + one max.
+    # wpm only covers timed essays; pad with 0, which never wins since wpm >= 0.
+    metrics = np.zeros((7, len(texts)))
+    metrics[0] = word_counts
+    metrics[1] = uniq_ratios
+    metrics[2] = filler_ratios
+    metrics[3] = repeat_runs
+    metrics[4] = bigram_rep
+    metrics[5] = trigram_rep
+    metrics[6, :wpm.size] = wpm
+    means = metrics.mean(axis=1).tolist()
+    maxes = metrics.max(axis=1).tolist()
+    n_mean, uniq_mean, filler_mean = means[0], means[1], means[2]
+    rep_run_max = int(maxes[3])
+    bi_rep_max, tri_rep_max, wpm_max = maxes[4], maxes[5], maxes[6]
+
+    # Clear abuse (“yes yes yes”) is hard-clamped below, so skip VADER + BERT and use
+    # their neutral fallbacks; the clamp then lands exactly on 5.0
+    is_spam = rep_run_max >= 3 and uniq_mean < 0.4 and n_mean < 40
+
+    if is_spam:
+        tone_mean = 0.0
+        authenticity = 0.5
+    else:
+        # Sentiment (tone)
+        comp_scores = _vader_sentiments(texts)
+        tone_mean = float(comp_scores.mean()) if comp_scores.size else 0.0
+        # Semantic flow authenticity (0..1)
+        authenticity = _semantic_flow(texts)
     tone = "Positive" if tone_mean > 0.4 else "Negative" if tone_mean < -0.4 else "Neutral"
 
-    # Semantic flow authenticity (0..1)
-    authenticity = _semantic_flow(texts)
-
     # ---------- Trait estimates (0..1)
     empathy = round((tone_mean + 1) / 2, 2)                 # maps -1..1 -> 0..1
     ethics = round((authenticity + empathy) / 2, 2)
-    clarity = round(float(np.mean(uniq_ratios)) * 0.9, 2)
-    critical_thinking = round(ethics * 0.9, 2)
-    inclusiveness = round((empathy + tone_mean + 1) / 3, 2)
-    accountability = round((authenticity + ethics) / 2, 2)
-    vocabulary_richness = round(float(np.mean(uniq_ratios)), 2)
-    tone_balance = round(tone_mean, 2)
-    leadership_signal = round((authenticity + empathy) / 2, 2)
-
+    features = np.array([1.0, tone_mean, authenticity, uniq_mean, empathy, ethics])
+    # Cap subtraits into [0.10, 0.94] like before (≈0.5–4.7 when scaled); bounds are
+    # 2-decimal values, so clipping before rounding matches the old round-then-clamp
+    traits_vec = np.clip(_TRAIT_W @ features, 0.10, 0.94)
+    # Python round(), not np.round: they disagree on halves like 0.735
     trait_scores = {
-        "empathy": empathy,
-        "ethical_reasoning": ethics,
-        "authenticity": authenticity,
-        "clarity": clarity,
-        "critical_thinking": critical_thinking,
-        "inclusiveness": inclusiveness,
-        "accountability": accountability,
-        "vocabulary_richness": vocabulary_richness,
-        "tone_balance": tone_balance,
-        "leadership_signal": leadership_signal,
+        k: (round(v, 2) if k in _TRAIT_ROUNDED else v)
+        for k, v in zip(_TRAIT_KEYS, traits_vec.tolist())
     }
 
     # ---------- STRICT penalties
-    # Core indicators aggregated across essays
-    n_mean = float(np.mean(word_counts))
-    uniq_mean = float(np.mean(uniq_ratios))
-    rep_run_max = int(max(repeat_runs) if repeat_runs else 0)
-    bi_rep_max = float(max(bigram_rep) if bigram_rep else 0.0)
-    tri_rep_max = float(max(trigram_rep) if trigram_rep else 0.0)
-    filler_mean = float(np.mean(filler_ratios)) if filler_ratios else 0.0
-    wpm_max = float(max(wpm) if wpm else 0.0)
-
-    penalty = 0.0
-
-    # very short overall
-    if n_mean < 60:
-        penalty += 0.35
-    if uniq_mean < 0.50:
-        penalty += 0.35
-
-    # spam/repetition
-    if rep_run_max >= 3:
-        penalty += 0.40       # “yes yes yes” etc.
-    if bi_rep_max > 0.35 or tri_rep_max > 0.25:
-        penalty += 0.30
-
-    # filler / fluff
-    if filler_mean > 0.08:
-        penalty += 0.15
-
-    # AI-ish phrasing
-    if ai_flags >= 2:
-        penalty += 0.40
-    elif ai_flags == 1:
-        penalty += 0.20
-
-    # timing anomalies
-    if paste_count > 0:
-        penalty += 0.70
-    if short_time_count >= 2 or very_short_any:
-        penalty += 0.30
-    if wpm_max >= 180:  # implausibly fast consistent typing
-        penalty += 0.25
+    # One flag per rule, in _PENALTY_W order; penalty is their weighted sum
+    penalty_flags = np.array([
+        n_mean < 60,                                   # very short overall
+        uniq_mean < 0.50,
+        rep_run_max >= 3,                              # “yes yes yes” etc.
+        bi_rep_max > 0.35 or tri_rep_max > 0.25,       # spam/repetition
+        filler_mean > 0.08,                            # filler / fluff
+        ai_flags >= 2,                                 # AI-ish phrasing
+        ai_flags == 1,
+        paste_count > 0,                               # timing anomalies
+        short_time_count >= 2 or very_short_any,
+        wpm_max >= 180,                                # implausibly fast consistent typing
+    ], dtype=np.float64)
+    penalty = float(penalty_flags @ _PENALTY_W)
 
     # ---------- Base content score (0..1)
     # Scales with length (cap ~180 words avg), boosted by diversity
@@ -316,17 +519,11 @@ def analyze_essay(texts, times, paste_flags):
     final_score = round(max(0.0, min(raw, 1.0)) * 100.0, 2)
 
     # Hard clamps for clear abuse
-    if rep_run_max >= 3 and uniq_mean < 0.4 and n_mean < 40:
+    if is_spam:
         final_score = min(final_score, 5.0)   # “yes yes yes” → near zero
     if paste_count > 0:
         final_score = min(final_score, 60.0)
 
-    # Cap displayed subtraits into [0.10, 0.94] like before (≈0.5–4.7 when scaled)
-    for k in trait_scores:
-        trait_scores[k] = max(min(trait_scores[k], 0.94), 0.10)
-
-    filtered_scores = {k: v for k, v in trait_scores.items() if k in valid_display_traits}
-
     return {
         "authenticity": round(authenticity, 2),
         "empathy_signal": round(empathy, 2),
@@ -350,13 +547,7 @@ def score_vr_answer(transcript: str, features: dict, rubric: dict | None = None)
       and challenge_passed (liveness).
     """
     text = (transcript or "").strip()
-    words = _words(text)
-    n = len(words)
-    uniq = len(set(words))
-    uniq_ratio = (uniq / n) if n else 0.0
-    repeat_run = _max_repeat_run(words)
-    bi_rep = _repetitiveness_ratio(words, 2)
-    tri_rep = _repetitiveness_ratio(words, 3)
+    n, uniq_ratio, repeat_run, bi_rep, tri_rep = _vr_metrics(text)
 
     # Content (0..30)
     length_comp = min(1.0, n / 120.0)
@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import Question, VRQuestion
+
+QUESTIONS_PER_TEST = 20
+QUESTION_POOL_TTL_SECONDS = 60 * 60
+_QUESTION_POOL_VERSION_KEY = "qpool:version"
+VR_QUESTION_IDS_TTL_SECONDS = 60 * 60
+_VR_QUESTION_IDS_KEY = "vrq:ids"
+
+
+def _question_pool_version():
+    return cache.get_or_set(_QUESTION_POOL_VERSION_KEY, 1, None)
+
+
+def invalidate_question_pools():
+    """Orphan every cached pool at once by bumping the version baked into their keys."""
+    try:
+        cache.incr(_QUESTION_POOL_VERSION_KEY)
+    except ValueError:
+        cache.set(_QUESTION_POOL_VERSION_KEY, 1, None)
+
+
+def _build_question_pools(user):
+    # age + gender in SQL; only the JSON profession_tags check is done here
+    profile = Question.objects.filter(
+        Q(gender_specific__isnull=True) | Q(gender_specific__in=["", user.gender]),
+        age_group__in=["all", user.age_range],
+    )
+    pools = {"strict": [], "fallback": [], "rest": []}
+    for qid, tags in profile.values_list("id", "profession_tags").iterator():
+        pools["fallback"].append(qid)
+        if user.profession in (tags or ()):
+            pools["strict"].append(qid)
+    # the view only tops up from outside the profile when it is short of a full test
+    if len(pools["fallback"]) < QUESTIONS_PER_TEST:
+        pools["rest"] = list(Question.objects.exclude(pk__in=profile.values("pk")).values_list("id", flat=True))
+    return pools
+
+
+def get_question_pools(user):
+    """
+    Question ids partitioned for the user's profile:
+        {"strict": [...], "fallback": [...], "rest": [...]}
+    strict = age + gender + profession, fallback = age + gender, rest = everything else
+    (only filled when fallback is short of QUESTIONS_PER_TEST; otherwise left empty).
+    Read through the cache only when settings.SHARED_CACHE: per-process LocMem would
+    only see the invalidations made by this worker's own signals.
+    """
+    if not settings.SHARED_CACHE:
+        return _build_question_pools(user)
+
+    key = f"qpool:{_question_pool_version()}:{user.age_range}:{user.gender}:{user.profession}"
+    pools = cache.get(key)
+    if pools is None:
+        pools = _build_question_pools(user)
+        cache.set(key, pools, QUESTION_POOL_TTL_SECONDS)
+    return pools
+
+
+def invalidate_vr_question_ids():
+    cache.delete(_VR_QUESTION_IDS_KEY)
+
+
+def get_vr_question_ids():
+    """All VRQuestion ids, so interviews can sample in Python (cached under settings.SHARED_CACHE)."""
+    if not settings.SHARED_CACHE:
+        return list(VRQuestion.objects.values_list("id", flat=True))
+
+    ids = cache.get(_VR_QUESTION_IDS_KEY)
+    if ids is None:
+        ids = list(VRQuestion.objects.values_list("id", flat=True))
+        cache.set(_VR_QUESTION_IDS_KEY, ids, VR_QUESTION_IDS_TTL_SECONDS)
+    return ids
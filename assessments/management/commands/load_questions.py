@@ -1,4 +1,6 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from assessments.caches import invalidate_question_pools
 from assessments.models import Question
 import random
 
@@ -139,13 +141,11 @@ class Command(BaseCommand):
             ]
         }
 
-        # Clear old questions
-        Question.objects.all().delete()
-
-        # Save curated 100 questions
+        # Build curated 100 questions in memory
+        objs = []
         for trait, questions in question_templates.items():
             for text in questions:
-                Question.objects.create(
+                objs.append(Question(
                     text=text,
                     trait=trait,
                     profession_tags=random.sample(professions, k=random.randint(1, 3)),
@@ -153,6 +153,13 @@ class Command(BaseCommand):
                     gender_specific=random.choice(genders),
                     weight=round(random.uniform(0.8, 1.2), 2),
                     reverse_score=random.choice([True, False])
-                )
+                ))
+
+        # Clear old questions and save the new set in one transaction
+        with transaction.atomic():
+            Question.objects.all().delete()
+            Question.objects.bulk_create(objs, batch_size=200)
+        # bulk_create skips post_save, so drop cached question pools explicitly
+        invalidate_question_pools()
 
         self.stdout.write(self.style.SUCCESS("✅ 100 high-quality leadership questions loaded successfully."))
@@ -1,6 +1,8 @@
+import itertools
 import random
 import string
 from django.core.management.base import BaseCommand
+from assessments.caches import invalidate_vr_question_ids
 from assessments.models import VRQuestion, EssayPrompt
 
 PILLARS = [
@@ -69,20 +71,11 @@ ESSAY_TEMPLATES = [
     "Discuss how your core values would influence decisions in a {scenario}.",
 ]
 
-def unique_generate(count, make_item):
-    """Generate 'count' unique text items using a factory function."""
-    items = []
-    seen = set()
-    attempts = 0
-    max_attempts = count * 20
-    while len(items) < count and attempts < max_attempts:
-        item = make_item()
-        attempts += 1
-        txt = item["text"].strip()
-        if txt not in seen:
-            seen.add(txt)
-            items.append(item)
-    return items
+def sample_combos(count, *pools):
+    """Pick up to 'count' distinct combinations from the cartesian product of pools."""
+    combos = list(itertools.product(*pools))
+    random.shuffle(combos)
+    return combos[:count]
 
 class Command(BaseCommand):
     help = "Seed DB with VR (default 150) and Essay (default 100) question pools. No JSON needed."
@@ -98,47 +91,39 @@ class Command(BaseCommand):
         random.seed(int(opts.get("shuffle_seed", 42)))
 
         self.stdout.write(self.style.NOTICE(f"Seeding VR questions: target {vr_count}"))
-        vr_items = unique_generate(vr_count, self.make_vr_item)
-        created_vr = 0
-        for it in vr_items:
-            obj, created = VRQuestion.objects.get_or_create(
-                text=it["text"],
-                defaults={
-                    "pillar_key": it["pillar_key"],
-                    "pillar_name": it["pillar_name"],
-                    "tags": it["tags"],
-                    "expected_tone": it["expected_tone"],
-                    "rubric": it["rubric"],
-                },
-            )
-            if created:
-                created_vr += 1
+        vr_items = [self.make_vr_item(*c) for c in sample_combos(vr_count, SCENARIOS, VR_TEMPLATES)]
+        created_vr = self.bulk_seed(VRQuestion, vr_items, (
+            "pillar_key", "pillar_name", "tags", "expected_tone", "rubric",
+        ))
+        # bulk_create skips post_save, so drop the cached VR id list explicitly
+        invalidate_vr_question_ids()
         self.stdout.write(self.style.SUCCESS(f"✅ VR: requested {vr_count}, created {created_vr}, existing {len(vr_items)-created_vr}"))
 
         self.stdout.write(self.style.NOTICE(f"Seeding Essay prompts: target {essay_count}"))
-        essay_items = unique_generate(essay_count, self.make_essay_item)
-        created_es = 0
-        for it in essay_items:
-            obj, created = EssayPrompt.objects.get_or_create(
-                text=it["text"],
-                defaults={
-                    "pillar_key": it["pillar_key"],
-                    "pillar_name": it["pillar_name"],
-                    "tags": it["tags"],
-                    "rubric": it["rubric"],
-                },
-            )
-            if created:
-                created_es += 1
+        essay_items = [self.make_essay_item(*c) for c in sample_combos(essay_count, SCENARIOS, ESSAY_TEMPLATES)]
+        created_es = self.bulk_seed(EssayPrompt, essay_items, (
+            "pillar_key", "pillar_name", "tags", "rubric",
+        ))
         self.stdout.write(self.style.SUCCESS(f"✅ Essay: requested {essay_count}, created {created_es}, existing {len(essay_items)-created_es}"))
 
         self.stdout.write(self.style.SUCCESS("🎉 Seeding complete."))
 
+    def bulk_seed(self, model, items, fields):
+        """Insert items whose text isn't stored yet: one lookup + batched INSERTs."""
+        existing = set(
+            model.objects.filter(text__in=[it["text"] for it in items]).values_list("text", flat=True)
+        )
+        to_create = [
+            model(text=it["text"], **{f: it[f] for f in fields})
+            for it in items if it["text"] not in existing
+        ]
+        model.objects.bulk_create(to_create, batch_size=500, ignore_conflicts=True)
+        return len(to_create)
+
     # --------- factories ----------
-    def make_vr_item(self):
+    # Text depends only on (scenario, template), so those are the sampled axes
+    def make_vr_item(self, scenario, template):
         pillar = random.choice(PILLARS)
-        scenario = random.choice(SCENARIOS)
-        template = random.choice(VR_TEMPLATES)
         text = template.format(scenario=scenario)
         return {
             "text": text,
@@ -153,10 +138,8 @@ class Command(BaseCommand):
             },
         }
 
-    def make_essay_item(self):
+    def make_essay_item(self, scenario, template):
         pillar = random.choice(PILLARS)
-        scenario = random.choice(SCENARIOS)
-        template = random.choice(ESSAY_TEMPLATES)
         text = template.format(scenario=scenario)
         return {
             "text": text,
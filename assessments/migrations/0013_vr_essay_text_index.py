@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-14 11:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0012_assessmentprogress'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='essayprompt',
+            name='text',
+            field=models.TextField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='vrquestion',
+            name='text',
+            field=models.TextField(db_index=True),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-14 11:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_open_session_answers(apps, schema_editor):
+    """Move answers of not-yet-completed sessions out of VRSession.choices."""
+    VRSession = apps.get_model('assessments', 'VRSession')
+    VRAnswer = apps.get_model('assessments', 'VRAnswer')
+    rows = []
+    for session in VRSession.objects.filter(completed_at__isnull=True).iterator():
+        for item in session.choices or []:
+            try:
+                question_id = int(item.get('question_id'))
+            except (AttributeError, TypeError, ValueError):
+                continue
+            rows.append(VRAnswer(
+                session_id=session.id,
+                question_id=question_id,
+                pillar_key=item.get('pillar_key'),
+                transcript=item.get('transcript') or '',
+                features=item.get('features') or {},
+            ))
+    VRAnswer.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0013_vr_essay_text_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VRAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_id', models.BigIntegerField()),
+                ('pillar_key', models.CharField(blank=True, max_length=100, null=True)),
+                ('transcript', models.TextField(blank=True)),
+                ('features', models.JSONField(default=dict)),
+                ('ts', models.DateTimeField(auto_now_add=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answers', to='assessments.vrsession')),
+            ],
+        ),
+        migrations.RunPython(copy_open_session_answers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-14 11:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def drop_duplicate_scores(apps, schema_editor):
+    """Keep the newest Score per (user, trait) so the constraint can be added."""
+    Score = apps.get_model('assessments', 'Score')
+    seen = set()
+    stale = []
+    for pk, user_id, trait in Score.objects.order_by('-id').values_list('id', 'user_id', 'trait').iterator():
+        if (user_id, trait) in seen:
+            stale.append(pk)
+        else:
+            seen.add((user_id, trait))
+    Score.objects.filter(id__in=stale).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0014_vranswer'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_duplicate_scores, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='score',
+            constraint=models.UniqueConstraint(fields=('user', 'trait'), name='score_user_trait_uniq'),
+        ),
+    ]
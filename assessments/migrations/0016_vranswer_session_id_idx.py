@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-14 11:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0015_score_user_trait_uniq'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vranswer',
+            index=models.Index(fields=['session', 'id'], name='vranswer_session_id_idx'),
+        ),
+    ]
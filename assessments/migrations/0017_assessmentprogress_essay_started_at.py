@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-14 12:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assessments', '0016_vranswer_session_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assessmentprogress',
+            name='essay_started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
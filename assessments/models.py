@@ -32,6 +32,12 @@ class Score(models.Model):
     trait = models.CharField(max_length=100)
     score = models.FloatField()  # Out of 5
 
+    class Meta:
+        constraints = [
+            # one score per trait; lets MCQ submit upsert instead of delete + insert
+            models.UniqueConstraint(fields=["user", "trait"], name="score_user_trait_uniq"),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.trait}: {self.score}"
 
@@ -74,7 +80,7 @@ class FinalScore(models.Model):
 # =========================
 
 class VRQuestion(models.Model):
-    text = models.TextField()
+    text = models.TextField(db_index=True)
     pillar_key = models.CharField(max_length=100)
     pillar_name = models.CharField(max_length=200)
     tags = models.JSONField(default=list)
@@ -86,7 +92,7 @@ class VRQuestion(models.Model):
 
 
 class EssayPrompt(models.Model):
-    text = models.TextField()
+    text = models.TextField(db_index=True)
     pillar_key = models.CharField(max_length=100)
     pillar_name = models.CharField(max_length=200)
     tags = models.JSONField(default=list)
@@ -136,11 +142,33 @@ class VRSession(models.Model):
 
     def __str__(self):
         return f"VRSession(user={self.user_id}, scenario={self.scenario})"
+
+
+class VRAnswer(models.Model):
+    # One row per recorded answer, so appending doesn't rewrite the whole session JSON
+    session = models.ForeignKey(VRSession, on_delete=models.CASCADE, related_name="answers")
+    question_id = models.BigIntegerField()
+    pillar_key = models.CharField(max_length=100, blank=True, null=True)
+    transcript = models.TextField(blank=True)
+    features = models.JSONField(default=dict)  # speech_rate_wps, avg_pause_sec, ...
+    ts = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # VRCompleteView reads a session's first answers in id order
+            models.Index(fields=["session", "id"], name="vranswer_session_id_idx"),
+        ]
+
+    def __str__(self):
+        return f"VRAnswer(session={self.session_id}, question={self.question_id})"
 # =========================
 # Flow Progress Tracking
 # =========================
+import copy
+
 from django.conf import settings
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
 
 class AssessmentProgress(models.Model):
     class Status(models.TextChoices):
@@ -150,6 +178,15 @@ class AssessmentProgress(models.Model):
         VR_DONE = "VR_DONE"
         FINALIZED = "FINALIZED"
 
+    # Flow rank per status (TextChoices hash like their str values, so DB strings work too)
+    _ORDER = {
+        Status.NOT_STARTED: 0,
+        Status.MCQ_DONE: 1,
+        Status.ESSAY_DONE: 2,
+        Status.VR_DONE: 3,
+        Status.FINALIZED: 4,
+    }
+
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -162,18 +199,39 @@ class AssessmentProgress(models.Model):
     )
     essay_snapshot = models.JSONField(null=True, blank=True)  # essay traits/subtraits/ai_comment
     vr_score = models.FloatField(null=True, blank=True)       # 0–50 after VR complete
+    essay_started_at = models.DateTimeField(null=True, blank=True)  # essay analysis running since
+
+    # get_progress() reads through this cache when settings.SHARED_CACHE; save() keeps it current
+    CACHE_TTL_SECONDS = 600
+    _CACHED_FIELDS = ("id", "user_id", "status", "essay_snapshot", "vr_score", "essay_started_at")
+
+    @staticmethod
+    def cache_key(user_id):
+        return f"aprog:{user_id}"
+
+    def cache_fields(self):
+        # plain column values only, never the instance (it would carry the cached user row)
+        return {name: copy.deepcopy(getattr(self, name)) for name in self._CACHED_FIELDS}
+
+    @classmethod
+    def from_cache(cls, fields):
+        return cls.from_db("default", cls._CACHED_FIELDS, [fields[name] for name in cls._CACHED_FIELDS])
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if not settings.SHARED_CACHE:
+            return
+        # Write through (not delete) once committed: a reader that missed the cache
+        # meanwhile only cache.add()s, so it can't put an older row back
+        fields = self.cache_fields()
+        transaction.on_commit(
+            lambda: cache.set(self.cache_key(fields["user_id"]), fields, self.CACHE_TTL_SECONDS)
+        )
 
     def advance(self, next_status):
-        order = [
-            self.Status.NOT_STARTED,
-            self.Status.MCQ_DONE,
-            self.Status.ESSAY_DONE,
-            self.Status.VR_DONE,
-            self.Status.FINALIZED,
-        ]
-        if order.index(next_status) >= order.index(self.status):
+        if self._ORDER[next_status] >= self._ORDER[self.status]:
             self.status = next_status
-            self.save()
+            self.save(update_fields=["status"])
 
     def __str__(self):
         return f"{self.user_id} → {self.status}"
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caches import invalidate_question_pools, invalidate_vr_question_ids
+from .models import Question, VRQuestion
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def _question_changed(sender, **kwargs):
+    invalidate_question_pools()
+
+
+@receiver(post_save, sender=VRQuestion)
+@receiver(post_delete, sender=VRQuestion)
+def _vr_question_changed(sender, **kwargs):
+    invalidate_vr_question_ids()
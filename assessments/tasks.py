@@ -0,0 +1,69 @@
+import datetime
+import logging
+import threading
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .ai_analysis import analyze_essay
+from .models import AssessmentProgress
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on how long /progress/ reports the essay as pending if a worker dies mid-run
+ESSAY_PENDING_TTL_SECONDS = 10 * 60
+
+
+def is_essay_pending(prog):
+    # kept on the progress row (not a per-process cache) so every worker sees it
+    started = prog.essay_started_at
+    return started is not None and timezone.now() - started < datetime.timedelta(seconds=ESSAY_PENDING_TTL_SECONDS)
+
+
+def run_essay_analysis(user_id, answers, timers, pasted):
+    """Score the essays, store the snapshot and move progress MCQ_DONE -> ESSAY_DONE."""
+    ai_result = analyze_essay(answers, timers, pasted)
+
+    with transaction.atomic():
+        prog = AssessmentProgress.objects.select_for_update().get(user_id=user_id)
+        # user reset (or otherwise moved on) while we were scoring
+        if prog.status != AssessmentProgress.Status.MCQ_DONE:
+            return
+
+        # save essay snapshot for final combination after VR
+        prog.essay_snapshot = {
+            "essay_score": ai_result["final_ai_score"],   # 0–100
+            "traits": ai_result["traits"],                # 0–1 per trait
+            "subtraits": ai_result["subtraits"],
+            "ai_comment": ai_result["ai_comment"],
+        }
+        prog.essay_started_at = None
+        prog.save(update_fields=["essay_snapshot", "essay_started_at"])
+        prog.advance(AssessmentProgress.Status.ESSAY_DONE)
+
+
+def _clear_essay_pending(user_id):
+    with transaction.atomic():
+        prog = AssessmentProgress.objects.select_for_update().get(user_id=user_id)
+        if prog.essay_started_at is not None:
+            prog.essay_started_at = None
+            prog.save(update_fields=["essay_started_at"])
+
+
+def run_essay_analysis_async(prog, answers, timers, pasted):
+    """Run run_essay_analysis on a background thread; /progress/ reports essay_pending meanwhile."""
+    prog.essay_started_at = timezone.now()
+    prog.save(update_fields=["essay_started_at"])
+    user_id = prog.user_id
+
+    def _run():
+        try:
+            run_essay_analysis(user_id, answers, timers, pasted)
+        except Exception as e:
+            logger.exception("Essay analysis error: %s", e)
+            # let the user resubmit straight away instead of waiting out the TTL
+            _clear_essay_pending(user_id)
+        finally:
+            connection.close()  # this thread's own DB connection
+
+    threading.Thread(target=_run, daemon=True).start()
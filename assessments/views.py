@@ -1,8 +1,11 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from collections import defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 import random
+import numpy as np
 
 from .models import (
     Question,
@@ -14,10 +17,12 @@ from .models import (
     VRSession,  # <-- needed for reset
 )
 from .serializers import QuestionSerializer, EssayResponseSerializer
-from .ai_analysis import analyze_essay
+from .caches import QUESTIONS_PER_TEST, get_question_pools, invalidate_question_pools
+from .tasks import is_essay_pending, run_essay_analysis_async
 
 # ✅ Traits to be displayed only (scientifically validated)
-DISPLAY_TRAITS = [
+# Kept ordered (not a set): it breaks score ties when picking the top 5
+DISPLAY_TRAITS = (
     "empathy",
     "ethical_reasoning",
     "authenticity",
@@ -25,11 +30,29 @@ DISPLAY_TRAITS = [
     "clarity",
     "inclusiveness",
     "accountability",
-]
+)
+
+# Likert answer -> raw 1..5 (unknown answers count as Neutral)
+SCORE_MAP = {
+    "Strongly Disagree": 1,
+    "Disagree": 2,
+    "Neutral": 3,
+    "Agree": 4,
+    "Strongly Agree": 5,
+}
 
 # ---------- helpers ----------
 def get_progress(user):
+    if not settings.SHARED_CACHE:
+        return AssessmentProgress.objects.get_or_create(user=user)[0]
+
+    key = AssessmentProgress.cache_key(user.id)
+    fields = cache.get(key)
+    if fields is not None:
+        return AssessmentProgress.from_cache(fields)
     prog, _ = AssessmentProgress.objects.get_or_create(user=user)
+    # add, not set: never overwrite a newer row written through by save()
+    cache.add(key, prog.cache_fields(), AssessmentProgress.CACHE_TTL_SECONDS)
     return prog
 
 # ---------- progress endpoint ----------
@@ -38,48 +61,46 @@ class ProgressView(APIView):
 
     def get(self, request):
         prog = get_progress(request.user)
-        return Response({"status": prog.status})
+        # essay_pending: essay submitted, analysis still running (poll until ESSAY_DONE)
+        return Response({"status": prog.status, "essay_pending": is_essay_pending(prog)})
 
 # ---------- MCQ (Questions + Submit) ----------
 class QuestionListView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @staticmethod
+    def _sample(pools):
+        strict = pools["strict"]
+        if len(strict) >= QUESTIONS_PER_TEST:
+            return random.sample(strict, QUESTIONS_PER_TEST)
+        # strict is a subset of fallback
+        combined = pools["fallback"]
+        if len(combined) >= QUESTIONS_PER_TEST:
+            return random.sample(combined, QUESTIONS_PER_TEST)
+        # top up from questions outside the profile
+        rest = pools["rest"]
+        return combined + random.sample(rest, min(QUESTIONS_PER_TEST - len(combined), len(rest)))
+
     def get(self, request):
         user = request.user
         # allow fetching even if NOT_STARTED
-        strict = list(
-            Question.objects.filter(
-                age_group__in=["all", user.age_range],
-                gender_specific__in=[None, "", user.gender],
-                profession_tags__overlap=[user.profession],
-            )
-        )
-
-        if len(strict) >= 20:
-            selected = random.sample(strict, 20)
-        else:
-            fallback = list(
-                Question.objects.filter(
-                    age_group__in=["all", user.age_range],
-                    gender_specific__in=[None, "", user.gender],
-                )
-            )
-            combined = list(set(strict + fallback))
-            if len(combined) >= 20:
-                selected = random.sample(combined, 20)
-            else:
-                all_qs = list(Question.objects.all())
-                remaining_needed = 20 - len(combined)
-                additional = random.sample(all_qs, min(remaining_needed, len(all_qs)))
-                selected = combined + additional
-
-        if len(selected) < 20:
+        for _ in range(2):
+            sampled = self._sample(get_question_pools(user))
+            questions = Question.objects.in_bulk(sampled)
+            if len(questions) == len(sampled):
+                break
+            # the cached pool lists questions deleted since it was built: rebuild it and resample
+            invalidate_question_pools()
+        # counted after hydration, so a stale pool can't hand out fewer than QUESTIONS_PER_TEST
+        selected = [qid for qid in sampled if qid in questions]
+
+        if len(selected) < QUESTIONS_PER_TEST:
             return Response(
                 {"message": "Not enough questions available in the database."},
                 status=400,
             )
 
-        serializer = QuestionSerializer(selected, many=True)
+        serializer = QuestionSerializer([questions[qid] for qid in selected], many=True)
         return Response(serializer.data)
 
 class SubmitAnswersView(APIView):
@@ -100,33 +121,48 @@ class SubmitAnswersView(APIView):
         if len(responses) != 20:
             return Response({"message": "All 20 questions must be answered."}, status=400)
 
-        # reset MCQ layer
-        Score.objects.filter(user=user).delete()
+        # reset MCQ layer (scores are upserted below)
         UserResponse.objects.filter(user=user).delete()
 
-        trait_scores = defaultdict(list)
-        score_map = {
-            "Strongly Disagree": 1,
-            "Disagree": 2,
-            "Neutral": 3,
-            "Agree": 4,
-            "Strongly Agree": 5,
-        }
+        # one SELECT for all answered questions instead of one per answer
+        questions = Question.objects.in_bulk([int(qid) for qid in responses])
+        answered = [
+            (questions[qid], ans)
+            for qid, ans in ((int(qid), ans) for qid, ans in responses.items())
+            if qid in questions
+        ]
+        n = len(answered)
+
+        # Score every answer at once: Likert value, reversed where flagged, times weight
+        raws = np.fromiter((SCORE_MAP.get(ans, 3) for _, ans in answered), dtype=np.int64, count=n)
+        reverse = np.fromiter((bool(getattr(q, "reverse_score", False)) for q, _ in answered), dtype=bool, count=n)
+        raws = np.where(reverse, 6 - raws, raws)
+        weights = np.fromiter((q.weight for q, _ in answered), dtype=np.float64, count=n)
+
+        # Per-trait mean via bincount; traits keep first-seen order
+        trait_ids = {}
+        trait_idx = np.fromiter(
+            (trait_ids.setdefault(q.trait, len(trait_ids)) for q, _ in answered), dtype=np.intp, count=n
+        )
+        sums = np.bincount(trait_idx, weights=raws * weights, minlength=len(trait_ids))
+        counts = np.bincount(trait_idx, minlength=len(trait_ids))
+        avgs = np.minimum(sums / np.maximum(counts, 1), 5.0)
 
-        for qid, ans in responses.items():
-            try:
-                question = Question.objects.get(id=int(qid))
-            except Question.DoesNotExist:
-                continue
-            raw = score_map.get(ans, 3)
-            if getattr(question, "reverse_score", False):
-                raw = 6 - raw
-            trait_scores[question.trait].append(raw * question.weight)
-            UserResponse.objects.create(user=user, question=question, answer=raw)
-
-        for trait, values in trait_scores.items():
-            avg = round(min(sum(values) / max(len(values), 1), 5.0), 2)
-            Score.objects.create(user=user, trait=trait, score=avg)
+        UserResponse.objects.bulk_create(
+            [UserResponse(user=user, question=q, answer=raw) for (q, _), raw in zip(answered, raws.tolist())],
+            batch_size=500,
+        )
+        # Upsert this submission's traits; drop traits it no longer covers
+        Score.objects.filter(user=user).exclude(trait__in=list(trait_ids)).delete()
+        Score.objects.bulk_create(
+            [
+                Score(user=user, trait=trait, score=round(avg, 2))
+                for trait, avg in zip(trait_ids, avgs.tolist())
+            ],
+            update_conflicts=True,
+            unique_fields=["user", "trait"],
+            update_fields=["score"],
+        )
 
         prog.advance(AssessmentProgress.Status.MCQ_DONE)
         return Response({"message": "MCQ saved successfully.", "next": "ESSAY"})
@@ -140,6 +176,8 @@ class EssaySubmitView(APIView):
         prog = get_progress(user)
         if prog.status != AssessmentProgress.Status.MCQ_DONE:
             return Response({"message": "Out of order: complete MCQs first."}, status=409)
+        if is_essay_pending(prog):
+            return Response({"message": "Essay analysis already in progress."}, status=409)
 
         serializer = EssayResponseSerializer(data=request.data)
         if not serializer.is_valid():
@@ -148,40 +186,37 @@ class EssaySubmitView(APIView):
         data = serializer.validated_data
         answers, timers, pasted = data["answers"], data["timers"], data["is_pasted"]
 
-        # persist essay responses
-        for i in range(3):
-            EssayResponse.objects.create(
-                user=user,
-                question_number=i + 1,
-                answer_text=answers[i],
-                typing_time_seconds=timers[i],
-                paste_detected=pasted[i],
-            )
-
-        # analyze essay
-        ai_result = analyze_essay(answers, timers, pasted)
-        essay_score = ai_result["final_ai_score"]   # 0–100
-        all_traits = ai_result["traits"]            # 0–1 per trait
-        subtrait_map = ai_result["subtraits"]
-        ai_comment = ai_result["ai_comment"]
-
         # ensure MCQ exists
-        mcq_scores = {s.trait: s.score for s in Score.objects.filter(user=user)}
-        if not mcq_scores:
+        if not Score.objects.filter(user=user).exists():
             return Response({"message": "MCQ data missing"}, status=400)
 
-        # save essay snapshot for final combination after VR
-        prog.essay_snapshot = {
-            "essay_score": essay_score,
-            "traits": all_traits,
-            "subtraits": subtrait_map,
-            "ai_comment": ai_comment,
-        }
-        prog.advance(AssessmentProgress.Status.ESSAY_DONE)
+        # persist essay responses; replaces a previous attempt whose analysis failed
+        with transaction.atomic():
+            EssayResponse.objects.filter(user=user).delete()
+            EssayResponse.objects.bulk_create([
+                EssayResponse(
+                    user=user,
+                    question_number=i + 1,
+                    answer_text=answers[i],
+                    typing_time_seconds=timers[i],
+                    paste_detected=pasted[i],
+                )
+                for i in range(3)
+            ])
 
-        return Response({"message": "Essay saved. Proceed to VR.", "next": "VR"})
+        # analyze essay off the request; the task saves the snapshot and advances to ESSAY_DONE
+        run_essay_analysis_async(prog, answers, timers, pasted)
+
+        return Response(
+            {"message": "Essay saved. Analysis in progress.", "status": "processing", "next": "VR"},
+            status=202,
+        )
 
 # ---------- Finalization (called after VR completion) ----------
+def _clamp_trait(x, hi=4.7):
+    """Per-source trait score on the 0.5..hi scale, 2 decimals."""
+    return max(0.5, round(min(x, hi), 2))
+
 def finalize_result(user):
     prog = get_progress(user)
     if prog.status != AssessmentProgress.Status.VR_DONE:
@@ -193,7 +228,7 @@ def finalize_result(user):
     subtrait_map = snap.get("subtraits", {})
     ai_comment = snap.get("ai_comment", "")
 
-    mcq_scores = {s.trait: s.score for s in Score.objects.filter(user=user)}
+    mcq_scores = dict(Score.objects.filter(user=user).values_list("trait", "score"))
     if not mcq_scores:
         return None, Response({"message": "MCQ data missing"}, status=400)
 
@@ -202,11 +237,9 @@ def finalize_result(user):
 
     # Combine MCQ + Essay into top_5 (each trait max 10)
     combined_traits = {}
-    for trait in DISPLAY_TRAITS:
-        if trait not in subtrait_map:
-            continue
-        mcq_val = max(0.5, round(min(mcq_scores.get(trait, 0), 4.7), 2))
-        essay_val = max(0.5, round(min(all_traits.get(trait, 0) * 5.0, 4.7), 2))
+    for trait in (t for t in DISPLAY_TRAITS if t in subtrait_map):
+        mcq_val = _clamp_trait(mcq_scores.get(trait, 0))
+        essay_val = _clamp_trait(all_traits.get(trait, 0) * 5.0)
         total = round(min(mcq_val + essay_val, 10.0), 2)
         combined_traits[trait] = {
             "score": total,
@@ -273,18 +306,21 @@ class ResetAssessmentView(APIView):
     def post(self, request):
         u = request.user
 
-        # delete all user-scoped assessment artifacts
-        UserResponse.objects.filter(user=u).delete()
-        Score.objects.filter(user=u).delete()
-        EssayResponse.objects.filter(user=u).delete()
-        VRSession.objects.filter(user=u).delete()
-        FinalScore.objects.filter(user=u).delete()
-
-        # reset/initialize progress
-        prog, _ = AssessmentProgress.objects.get_or_create(user=u)
-        prog.status = AssessmentProgress.Status.NOT_STARTED
-        prog.essay_snapshot = None
-        prog.vr_score = None
-        prog.save()
+        # all-or-nothing: a failure part way must not leave a half-reset assessment
+        with transaction.atomic():
+            # delete all user-scoped assessment artifacts
+            UserResponse.objects.filter(user=u).delete()
+            Score.objects.filter(user=u).delete()
+            EssayResponse.objects.filter(user=u).delete()
+            VRSession.objects.filter(user=u).delete()  # cascades to VRAnswer
+            FinalScore.objects.filter(user=u).delete()
+
+            # reset/initialize progress
+            prog, _ = AssessmentProgress.objects.get_or_create(user=u)
+            prog.status = AssessmentProgress.Status.NOT_STARTED
+            prog.essay_snapshot = None
+            prog.vr_score = None
+            prog.essay_started_at = None
+            prog.save(update_fields=["status", "essay_snapshot", "vr_score", "essay_started_at"])
 
         return Response({"message": "Assessment reset. You can start again."})
@@ -2,6 +2,8 @@ import os
 import datetime
 import stripe
 
+from django.core.cache import cache
+from django.db import transaction
 from django.http import HttpResponse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
@@ -10,6 +12,8 @@ from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from protopia_backend.stripe_events import construct_event
+
 from .models import SubscriptionPlan, UserSubscription
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -22,6 +26,8 @@ PRICE_MAP = {
     "monthly": os.getenv("STRIPE_PRICE_MONTHLY", ""),
     "yearly": os.getenv("STRIPE_PRICE_YEARLY", ""),
 }
+STRIPE_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:3000")
 
 
 def get_or_create_user_sub(user):
@@ -29,6 +35,66 @@ def get_or_create_user_sub(user):
     return sub
 
 
+# Short-lived cache of Stripe lookups so repeat activations (double clicks, retries,
+# racing the webhook) skip the HTTPS round-trips
+STRIPE_LOOKUP_TTL_SECONDS = 300
+PAID_STATUSES = ("paid", "no_payment_required")
+
+
+def _plan_id(plan_key, sync_price=False):
+    """
+    Id of the SubscriptionPlan for a cadence, creating it if needed. Cached per
+    (cadence, price id), so a matching plan costs no query after the first call.
+    sync_price: also point an existing plan at the current PRICE_MAP price id.
+    """
+    price_id = PRICE_MAP[plan_key]
+    key = f"stripe:plan:{plan_key}:{price_id}"
+    plan_id = cache.get(key)
+    if plan_id is None:
+        plan, _ = SubscriptionPlan.objects.get_or_create(
+            cadence=plan_key,
+            defaults={"name": plan_key.capitalize(), "stripe_price_id": price_id},
+        )
+        if plan.stripe_price_id != price_id:
+            if not sync_price:
+                return plan.id  # don't cache a plan that doesn't match the key
+            plan.stripe_price_id = price_id
+            plan.save(update_fields=["stripe_price_id"])
+        plan_id = plan.id
+        cache.set(key, plan_id, STRIPE_LOOKUP_TTL_SECONDS)
+    return plan_id
+
+
+def _checkout_session_info(session_id):
+    """The Checkout Session fields activation needs; only paid (immutable) sessions are cached."""
+    key = f"stripe:session:{session_id}"
+    info = cache.get(key)
+    if info is None:
+        session = stripe.checkout.Session.retrieve(session_id)
+        plan_key = None
+        if "metadata" in session and session["metadata"]:
+            plan_key = (session["metadata"].get("plan") or "").lower()
+        info = {
+            "payment_status": session.get("payment_status"),
+            "customer": session.get("customer"),
+            "subscription": session.get("subscription"),
+            "plan": plan_key,
+        }
+        if info["payment_status"] in PAID_STATUSES:
+            cache.set(key, info, STRIPE_LOOKUP_TTL_SECONDS)
+    return info
+
+
+def _subscription_period_end(stripe_sub_id):
+    """current_period_end (unix ts) of a Stripe subscription."""
+    key = f"stripe:sub_period_end:{stripe_sub_id}"
+    end_ts = cache.get(key)
+    if end_ts is None:
+        end_ts = stripe.Subscription.retrieve(stripe_sub_id)["current_period_end"]
+        cache.set(key, end_ts, STRIPE_LOOKUP_TTL_SECONDS)
+    return end_ts
+
+
 # ────────────────────────────────────────────────────────────────────────────────
 # Create a Stripe Checkout Session
 # ────────────────────────────────────────────────────────────────────────────────
@@ -43,13 +109,7 @@ class CreateCheckoutSessionView(APIView):
         price_id = PRICE_MAP[plan_key]
 
         # Ensure DB plan record exists & matches price id
-        plan, _ = SubscriptionPlan.objects.get_or_create(
-            cadence=plan_key,
-            defaults={"name": plan_key.capitalize(), "stripe_price_id": price_id},
-        )
-        if plan.stripe_price_id != price_id:
-            plan.stripe_price_id = price_id
-            plan.save(update_fields=["stripe_price_id"])
+        _plan_id(plan_key, sync_price=True)
 
         # Customer
         sub = get_or_create_user_sub(request.user)
@@ -61,10 +121,9 @@ class CreateCheckoutSessionView(APIView):
             sub.save(update_fields=["stripe_customer_id"])
 
         # Frontend success/cancel
-        frontend_url = os.getenv("FRONTEND_URL", "http://localhost:3000")
         # IMPORTANT: include session id so we can verify on success page
-        success_url = f"{frontend_url}/payment/success?session_id={{CHECKOUT_SESSION_ID}}"
-        cancel_url = f"{frontend_url}/payment/cancel"
+        success_url = f"{FRONTEND_URL}/payment/success?session_id={{CHECKOUT_SESSION_ID}}"
+        cancel_url = f"{FRONTEND_URL}/payment/cancel"
 
         session = stripe.checkout.Session.create(
             mode="subscription",
@@ -94,19 +153,17 @@ class ActivateSubscriptionView(APIView):
             return Response({"error": "session_id is required"}, status=400)
 
         try:
-            session = stripe.checkout.Session.retrieve(session_id)
+            session = _checkout_session_info(session_id)
         except Exception:
             return Response({"error": "Invalid session_id"}, status=400)
 
         # Must be paid / completed
-        if session.get("payment_status") not in ("paid", "no_payment_required"):
+        if session["payment_status"] not in PAID_STATUSES:
             return Response({"error": "Payment not completed yet"}, status=400)
 
-        customer_id = session.get("customer")
-        stripe_sub_id = session.get("subscription")
-        plan_key = None
-        if "metadata" in session and session["metadata"]:
-            plan_key = (session["metadata"].get("plan") or "").lower()
+        customer_id = session["customer"]
+        stripe_sub_id = session["subscription"]
+        plan_key = session["plan"]
 
         # Get or create user's DB sub
         sub = get_or_create_user_sub(request.user)
@@ -118,8 +175,7 @@ class ActivateSubscriptionView(APIView):
 
             # Pull current period end from Stripe subscription
             try:
-                s = stripe.Subscription.retrieve(stripe_sub_id)
-                end_ts = s["current_period_end"]
+                end_ts = _subscription_period_end(stripe_sub_id)
                 sub.current_period_end = timezone.make_aware(
                     datetime.datetime.fromtimestamp(end_ts)
                 )
@@ -128,11 +184,7 @@ class ActivateSubscriptionView(APIView):
 
         # Attach plan if we know it
         if plan_key in PRICE_MAP:
-            plan, _ = SubscriptionPlan.objects.get_or_create(
-                cadence=plan_key,
-                defaults={"name": plan_key.capitalize(), "stripe_price_id": PRICE_MAP[plan_key]},
-            )
-            sub.plan = plan
+            sub.plan_id = _plan_id(plan_key)
 
         sub.save()
         return Response({"status": "active"})
@@ -143,12 +195,12 @@ class ActivateSubscriptionView(APIView):
 # ────────────────────────────────────────────────────────────────────────────────
 @csrf_exempt
 def stripe_webhook_view(request):
-    endpoint_secret = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+    endpoint_secret = STRIPE_WEBHOOK_SECRET
     payload = request.body
     sig_header = request.META.get("HTTP_STRIPE_SIGNATURE")
 
     try:
-        event = stripe.Webhook.construct_event(payload, sig_header, endpoint_secret)
+        event = construct_event(payload, sig_header, endpoint_secret)
     except Exception:
         return HttpResponse(status=400)
 
@@ -165,40 +217,49 @@ def stripe_webhook_view(request):
             user_id = data["metadata"].get("user_id")
             plan_key = (data["metadata"].get("plan") or "").lower()
 
-        # Fallback: look up by customer id
-        if not user_id and "customer" in data:
-            try:
-                sub = UserSubscription.objects.get(stripe_customer_id=data["customer"])
-                user_id = sub.user_id
-            except UserSubscription.DoesNotExist:
-                user_id = None
-
-        if user_id:
-            try:
-                sub = UserSubscription.objects.get(user_id=user_id)
-            except UserSubscription.DoesNotExist:
-                return HttpResponse(status=200)
-
+        # subscription events carry the subscription itself; others reference it by id
+        if data.get("object") == "subscription":
+            stripe_sub_id = data.get("id")
+        else:
             stripe_sub_id = data.get("subscription")
-            current_period_end = None
-            if stripe_sub_id:
-                s = stripe.Subscription.retrieve(stripe_sub_id)
-                current_period_end = timezone.make_aware(
-                    datetime.datetime.fromtimestamp(s["current_period_end"])
-                )
 
-            if plan_key in PRICE_MAP:
-                plan, _ = SubscriptionPlan.objects.get_or_create(
-                    cadence=plan_key,
-                    defaults={"name": plan_key.capitalize(), "stripe_price_id": PRICE_MAP[plan_key]},
-                )
-                sub.plan = plan
-
-            sub.status = "active"
-            if stripe_sub_id:
-                sub.stripe_sub_id = stripe_sub_id
-            if current_period_end:
-                sub.current_period_end = current_period_end
-            sub.save()
+        # only ask Stripe when the event doesn't already carry the period end; done before
+        # the row lock below so it is never held across an HTTPS round-trip
+        end_ts = data.get("current_period_end")
+        if end_ts is None and stripe_sub_id and (user_id or "customer" in data):
+            end_ts = _subscription_period_end(stripe_sub_id)
+
+        # concurrent deliveries for the same customer apply one after the other
+        with transaction.atomic():
+            subs = UserSubscription.objects.select_for_update()
+
+            # Fallback: look up by customer id
+            sub = None
+            if not user_id and "customer" in data:
+                try:
+                    sub = subs.get(stripe_customer_id=data["customer"])
+                    user_id = sub.user_id
+                except UserSubscription.DoesNotExist:
+                    user_id = None
+
+            if user_id:
+                # the customer lookup already loaded the row; only fetch by user otherwise
+                if sub is None:
+                    try:
+                        sub = subs.get(user_id=user_id)
+                    except UserSubscription.DoesNotExist:
+                        return HttpResponse(status=200)
+
+                if plan_key in PRICE_MAP:
+                    sub.plan_id = _plan_id(plan_key)
+
+                sub.status = "active"
+                if stripe_sub_id:
+                    sub.stripe_sub_id = stripe_sub_id
+                if end_ts:
+                    sub.current_period_end = timezone.make_aware(
+                        datetime.datetime.fromtimestamp(end_ts)
+                    )
+                sub.save()
 
     return HttpResponse(status=200)
@@ -1,11 +1,43 @@
+import random
+
+import numpy as np
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 
-from .models import VRSession, VRQuestion, AssessmentProgress
+from .models import VRSession, VRAnswer, VRQuestion, AssessmentProgress
+from .caches import get_vr_question_ids
 from .views import get_progress, finalize_result
 
+# VR answer heuristics: words -> 1..6 pts, speech rate -> 0..3 pts, pauses -> 0..1 pts
+_LEN_THRESHOLDS = np.array([15, 30, 50, 80, 120])
+_LEN_POINTS = np.array([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+_PAUSE_THRESHOLDS = np.array([0.8, 2.0])
+_PAUSE_POINTS = np.array([1.0, 0.5, 0.0])
+
+def score_vr_answers(answers):
+    """0–10 per VRAnswer, scored for all answers at once."""
+    n = len(answers)
+    words = np.empty(n, dtype=np.int64)
+    wps = np.empty(n)
+    pauses = np.empty(n)
+    for i, item in enumerate(answers):
+        features = item.features or {}
+        words[i] = len((item.transcript or "").split())
+        dur = float(features.get("_duration_sec") or 1.0)
+        wps[i] = float(features.get("speech_rate_wps") or (words[i] / max(1.0, dur)))
+        pauses[i] = float(features.get("avg_pause_sec") or 0.5)
+
+    length = _LEN_POINTS[np.searchsorted(_LEN_THRESHOLDS, words, side="right")]
+    fluency = np.select(
+        [(wps >= 1.2) & (wps <= 3.2), (wps >= 0.8) & (wps <= 4.0), (wps >= 0.5) & (wps <= 5.0)],
+        [3.0, 2.0, 1.0],
+        0.0,
+    )
+    pause = _PAUSE_POINTS[np.searchsorted(_PAUSE_THRESHOLDS, pauses, side="right")]
+    return np.clip(length + fluency + pause, 0.0, 10.0)
+
 
 class VRStartView(APIView):
     permission_classes = [IsAuthenticated]
@@ -20,21 +52,22 @@ class VRStartView(APIView):
             return Response({"message": "Out of order: complete Essay first."}, status=409)
 
         count = int(request.data.get("count", 5))
-        qs = list(VRQuestion.objects.order_by("?")[:max(1, count)])
+        ids = get_vr_question_ids()
+        picked = random.sample(ids, min(max(1, count), len(ids)))
+        rows = {
+            q["id"]: q
+            for q in VRQuestion.objects.filter(id__in=picked)
+            .values("id", "text", "pillar_key", "pillar_name")
+        }
+        # keep the sampled order; skip ids deleted since the list was cached
+        questions = [rows[i] for i in picked if i in rows]
 
         # Create a session; store nothing yet in choices (we’ll append answers later)
         session = VRSession.objects.create(user=request.user, scenario="ethics-01", choices=[])
 
         return Response({
             "session_id": session.id,
-            "questions": [
-                {
-                    "id": q.id,
-                    "text": q.text,
-                    "pillar_key": getattr(q, "pillar_key", None),
-                    "pillar_name": getattr(q, "pillar_name", None),
-                } for q in qs
-            ]
+            "questions": questions,
         })
 
 
@@ -43,7 +76,7 @@ class VRAnswerView(APIView):
 
     def post(self, request):
         """
-        Append one answer to session. We persist into VRSession.choices (a JSON list).
+        Append one answer to session. Each answer is its own VRAnswer row.
         Body: { session_id, question_id, pillar_key, transcript, features }
         """
         session_id = request.data.get("session_id")
@@ -54,26 +87,28 @@ class VRAnswerView(APIView):
 
         if not session_id or not question_id:
             return Response({"message": "Missing session_id or question_id."}, status=400)
+        try:
+            question_id = int(question_id)
+        except (TypeError, ValueError):
+            return Response({"message": "Invalid question_id."}, status=400)
 
         try:
-            session = VRSession.objects.get(id=session_id, user=request.user)
+            # only what the checks need; skip the choices JSON
+            session = VRSession.objects.only("id", "completed_at", "user_id").get(id=session_id, user=request.user)
         except VRSession.DoesNotExist:
             return Response({"message": "VR session not found."}, status=404)
 
         if session.completed_at:
             return Response({"message": "Session already completed."}, status=409)
 
-        # Append to choices list
-        choices = list(session.choices or [])
-        choices.append({
-            "question_id": question_id,
-            "pillar_key": pillar_key,
-            "transcript": transcript,
-            "features": features,
-            "ts": timezone.now().isoformat(),
-        })
-        session.choices = choices
-        session.save()
+        # One INSERT per answer; the session row itself is untouched
+        VRAnswer.objects.create(
+            session=session,
+            question_id=question_id,
+            pillar_key=pillar_key,
+            transcript=transcript,
+            features=features,
+        )
 
         return Response({"message": "Recorded"})
 
@@ -87,10 +122,6 @@ class VRCompleteView(APIView):
         and finalize combined result (MCQ+Essay+VR) -> FINALIZED.
         Body: { session_id }
         """
-        prog = get_progress(request.user)
-        if prog.status != AssessmentProgress.Status.ESSAY_DONE:
-            return Response({"message": "Out of order: Essay must be completed first."}, status=409)
-
         session_id = request.data.get("session_id")
         if not session_id:
             return Response({"message": "Missing session_id."}, status=400)
@@ -100,62 +131,35 @@ class VRCompleteView(APIView):
         except VRSession.DoesNotExist:
             return Response({"message": "VR session not found."}, status=404)
 
+        prog = get_progress(request.user)
+        # client retry after a successful completion: answer again, write nothing
         if session.completed_at:
-            # If already completed, re-use the stored vr_score if present in choices meta
-            # but since VRSession.choices is a list, we didn't store a vr_score item before.
-            # We'll just proceed to finalize_result guard below.
-            pass
+            return Response({"message": "Interview already finalized.", "vr_score": prog.vr_score})
+
+        if prog.status != AssessmentProgress.Status.ESSAY_DONE:
+            return Response({"message": "Out of order: Essay must be completed first."}, status=409)
+
+        # coalesce simultaneous completes of the same session: claiming completed_at is one
+        # conditional UPDATE, so across every worker only the first request does the work
+        completed_at = timezone.now()
+        claimed = VRSession.objects.filter(id=session.id, completed_at__isnull=True).update(completed_at=completed_at)
+        if not claimed:
+            return Response({"message": "Interview is being finalized."}, status=409)
+        try:
+            return self._complete(request, prog, session, completed_at)
+        except Exception:
+            # nothing was finalized; allow an immediate retry
+            VRSession.objects.filter(id=session.id).update(completed_at=None)
+            raise
 
-        answers = list(session.choices or [])[:5]
+    def _complete(self, request, prog, session, completed_at):
+        answers = list(session.answers.order_by("id")[:5])
 
         # --- Simple heuristic scoring (0–10 per answer, cap 5 answers -> 50) ---
-        def per_answer_score(item):
-            transcript = (item.get("transcript") or "").strip()
-            features = item.get("features") or {}
-            words = len([w for w in transcript.split() if w.strip()])
-            dur = float(features.get("_duration_sec") or 1.0)
-            wps = float(features.get("speech_rate_wps") or (words / max(1.0, dur)))
-            pauses = float(features.get("avg_pause_sec") or 0.5)
-
-            score = 0.0
-            # length
-            if words >= 120:
-                score += 6.0
-            elif words >= 80:
-                score += 5.0
-            elif words >= 50:
-                score += 4.0
-            elif words >= 30:
-                score += 3.0
-            elif words >= 15:
-                score += 2.0
-            else:
-                score += 1.0
-
-            # fluency
-            if 1.2 <= wps <= 3.2:
-                score += 3.0
-            elif 0.8 <= wps <= 4.0:
-                score += 2.0
-            elif 0.5 <= wps <= 5.0:
-                score += 1.0
-
-            # pauses
-            if pauses < 0.8:
-                score += 1.0
-            elif pauses < 2.0:
-                score += 0.5
-
-            return max(0.0, min(10.0, score))
-
-        per_scores = [per_answer_score(a) for a in answers]
-        while len(per_scores) < 5:
-            per_scores.append(0.0)
-
-        vr_score = round(sum(per_scores), 2)  # 0–50
+        vr_score = round(float(score_vr_answers(answers).sum()), 2)  # 0–50
 
         # mark session complete
-        session.completed_at = timezone.now()
+        session.completed_at = completed_at
         # append a light-weight summary record to choices for audit
         choices = list(session.choices or [])
         choices.append({"_summary": {"vr_score": vr_score, "answers_count": len(answers), "completed_at": session.completed_at.isoformat()}})
@@ -164,6 +168,7 @@ class VRCompleteView(APIView):
 
         # advance progress & finalize
         prog.vr_score = vr_score
+        prog.save(update_fields=["vr_score"])
         prog.advance(AssessmentProgress.Status.VR_DONE)
 
         fs, error = finalize_result(request.user)
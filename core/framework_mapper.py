@@ -20,22 +20,92 @@ framework_keywords = {
     "Leadership Competency": ["problem-solving", "decision", "communication", "feedback", "accountability"]
 }
 
+
+def _keyword_entries(keywords):
+    """(framework, trait or None, keyword) in definition order."""
+    for framework, criteria in keywords.items():
+        if isinstance(criteria, dict):  # For Big Five subcategories
+            for trait, words in criteria.items():
+                for word in words:
+                    yield framework, trait, word
+        else:
+            for word in criteria:
+                yield framework, None, word
+
+
+def _flatten(keywords):
+    """
+    Parallel tuples in definition order: KEYWORDS[i] is a keyword and OWNERS[i] its
+    (framework index, trait index or -1) into FRAMEWORKS / TRAITS.
+    """
+    frameworks, traits, words, owners = [], [], [], []
+    for framework, trait, word in _keyword_entries(keywords):
+        if not frameworks or frameworks[-1] != framework:
+            frameworks.append(framework)
+        if trait is not None and trait not in traits:
+            traits.append(trait)
+        words.append(word)
+        owners.append((len(frameworks) - 1, -1 if trait is None else traits.index(trait)))
+    return tuple(frameworks), tuple(traits), tuple(words), tuple(owners)
+
+
+def _keyword_ids(words):
+    """keyword -> its ids (a keyword can sit under several frameworks)"""
+    ids = {}
+    for i, word in enumerate(words):
+        ids.setdefault(word, []).append(i)
+    return ids
+
+
+FRAMEWORKS, TRAITS, KEYWORDS, OWNERS = _flatten(framework_keywords)
+# Ids follow definition order, so sorting a text's hit ids rebuilds the summary in order
+_KEYWORD_IDS = _keyword_ids(KEYWORDS)
+
+# Tokenize once, then test tokens against a set. \w+ runs are exactly the
+# spans a \b...\b match can cover, so this matches what re.search found.
+_WORD_RE = re.compile(r"\w+")
+_SINGLE_WORD_KEYWORDS = frozenset(w for w in _KEYWORD_IDS if _WORD_RE.fullmatch(w))
+# the few keywords spanning several words ("social contract", "self-aware")
+_MULTI_WORD_KEYWORDS = [w for w in _KEYWORD_IDS if w not in _SINGLE_WORD_KEYWORDS]
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == "_"  # same set as re's \w on str
+
+
+def _contains_word(text, word):
+    """re.search(rf"\b{word}\b", text) for a word that starts and ends with \w, via str.find."""
+    end = len(word)
+    i = text.find(word)
+    while i != -1:
+        if (i == 0 or not _is_word_char(text[i - 1])) and (
+            i + end == len(text) or not _is_word_char(text[i + end])
+        ):
+            return True
+        i = text.find(word, i + 1)
+    return False
+
+
+def _find_keywords(text):
+    """Every keyword that occurs in text as a whole word."""
+    found = set(_SINGLE_WORD_KEYWORDS.intersection(_WORD_RE.findall(text)))
+    for word in _MULTI_WORD_KEYWORDS:
+        if word in text and _contains_word(text, word):
+            found.add(word)
+    return found
+
+
 def analyze_frameworks(text):
     response_summary = {}
     text = text.lower()
+    found = _find_keywords(text)
 
-    for framework, criteria in framework_keywords.items():
-        if isinstance(criteria, dict):  # For Big Five subcategories
-            sub_results = {}
-            for trait, words in criteria.items():
-                hits = [word for word in words if re.search(rf'\b{word}\b', text)]
-                if hits:
-                    sub_results[trait] = hits
-            if sub_results:
-                response_summary[framework] = sub_results
+    # work scales with the hits, not with the size of framework_keywords
+    for i in sorted(i for word in found for i in _KEYWORD_IDS[word]):
+        framework, trait = OWNERS[i]
+        if trait < 0:
+            response_summary.setdefault(FRAMEWORKS[framework], []).append(KEYWORDS[i])
         else:
-            hits = [word for word in criteria if re.search(rf'\b{word}\b', text)]
-            if hits:
-                response_summary[framework] = hits
+            response_summary.setdefault(FRAMEWORKS[framework], {}).setdefault(TRAITS[trait], []).append(KEYWORDS[i])
 
     return response_summary
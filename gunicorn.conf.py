@@ -0,0 +1,28 @@
+# gunicorn.conf.py — picked up automatically when gunicorn starts from the repo root:
+#   gunicorn protopia_backend.wsgi
+# Worker count still comes from --workers / WEB_CONCURRENCY.
+import os
+
+# Import Django once in the master; workers fork from it and share those pages copy-on-write.
+# Background threads don't survive the fork, so anything that needs one (the queued log
+# handler in protopia_backend/log_handlers.py) starts it lazily in each worker.
+preload_app = True
+
+
+def when_ready(server):
+    """
+    PRELOAD_MODELS=1 also loads the BERT / VADER models in the master, so N workers
+    share one copy of the weights instead of each loading its own on first use.
+    Off by default: torch may start its OpenMP pool while loading, and forking after
+    that can hang workers on some builds — verify on the target image before enabling.
+    Only the assessment models are warmed: core.views.get_bert() (DistilBERT) backs
+    core/urls.py, which the project urls.py doesn't include, so it is left lazy.
+    """
+    if os.getenv("PRELOAD_MODELS", "0") != "1":
+        return
+
+    from assessments import ai_analysis
+
+    ai_analysis._load_bert()
+    ai_analysis._get_vader()
+    server.log.info("Preloaded assessment models in the master")
@@ -0,0 +1,11 @@
+def quantize_linear(model):
+    """
+    int8 dynamic quantization of the model's Linear layers: ~4x smaller weights,
+    faster CPU GEMMs. Returns the model unchanged where no quantized engine is available.
+    """
+    import torch  # callers already have torch; keeps this module import-safe without it
+
+    try:
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    except Exception:  # pragma: no cover - no quantized engine on this platform
+        return model
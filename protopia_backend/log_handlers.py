@@ -0,0 +1,41 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueueStreamHandler(QueueHandler):
+    """
+    Logging handler that only enqueues records; a listener thread writes them to stderr.
+    Request threads never block on the stream's lock or its flush.
+
+    The listener is started lazily by the first record in each process: settings are
+    loaded in a pre-fork master (gunicorn preload_app), and forked workers don't
+    inherit its thread, so each worker needs its own queue and listener.
+    """
+
+    def __init__(self):
+        super().__init__(queue.SimpleQueue())
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # a queue inherited across fork may hold the parent's records; start clean
+            self.queue = queue.SimpleQueue()
+            # records arrive already formatted by this handler's formatter
+            self._listener = QueueListener(self.queue, logging.StreamHandler())
+            self._listener.start()
+            atexit.register(self._listener.stop)
+            self._pid = os.getpid()
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        super().enqueue(record)
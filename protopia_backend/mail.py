@@ -0,0 +1,87 @@
+import functools
+import logging
+import queue
+import threading
+
+from django.core import mail
+
+logger = logging.getLogger(__name__)
+
+# Keep the SMTP session open between messages; close it after this long idle
+MAIL_IDLE_CLOSE_SECONDS = 30
+
+_outbox = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _deliver(message, connection):
+    """Send over the open connection, reconnecting once if the server dropped it."""
+    for attempt in range(2):
+        if connection is None:
+            connection = mail.get_connection(fail_silently=False)
+            connection.open()
+        try:
+            connection.send_messages([message])
+            return connection
+        except Exception:
+            try:
+                connection.close()
+            except Exception:
+                pass
+            connection = None
+            if attempt:
+                raise
+    return connection
+
+
+def _run_outbox():
+    connection = None
+    while True:
+        try:
+            build, on_failure = _outbox.get(timeout=MAIL_IDLE_CLOSE_SECONDS if connection else None)
+        except queue.Empty:
+            try:
+                connection.close()
+            except Exception as e:  # server already dropped the idle session
+                logger.warning("SMTP close error: %s", e)
+            connection = None
+            continue
+        try:
+            message = build()
+        except Exception as e:
+            logger.exception("Email build error: %s", e)
+            continue
+        if message is None:
+            continue
+        try:
+            connection = _deliver(message, connection)
+        except Exception as e:
+            logger.exception("Email send to %s failed: %s", ", ".join(message.to), e)
+            if on_failure is not None:
+                try:
+                    on_failure()
+                except Exception:
+                    logger.exception("Email on_failure callback error")
+
+
+def queue_mail(build, on_failure=None):
+    """
+    Queue build() to run on the outbox thread; it returns the EmailMessage to send, or
+    None to send nothing. Lets slow lookups (e.g. the recipient) happen off the request
+    without a thread of their own.
+    on_failure() runs on that thread if delivery fails for good (after the reconnect retry).
+    """
+    global _worker
+    # also restart a worker that died, so queued mail can't sit in _outbox forever
+    if _worker is None or not _worker.is_alive():
+        with _worker_lock:
+            if _worker is None or not _worker.is_alive():
+                _worker = threading.Thread(target=_run_outbox, daemon=True)
+                _worker.start()
+    _outbox.put((build, on_failure))
+
+
+def send_mail_async(subject, message, from_email, recipients, on_failure=None):
+    """Queue a plain-text email; one background thread sends them over a reused SMTP connection."""
+    queue_mail(functools.partial(mail.EmailMessage, subject, message, from_email, recipients), on_failure)
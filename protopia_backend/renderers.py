@@ -0,0 +1,30 @@
+from rest_framework.utils import encoders
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+# DRF's encoder still handles what orjson can't (lazy strings, Decimal, querysets, ...)
+_fallback = encoders.JSONEncoder().default
+
+
+def dumps(data) -> bytes:
+    """Compact UTF-8 JSON, via orjson when installed."""
+    if orjson is None:
+        return JSONRenderer().render(data)
+    return orjson.dumps(data, default=_fallback, option=_ORJSON_OPTIONS)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in JSONRenderer that encodes with orjson (C) instead of the stdlib json module."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        return dumps(data)
@@ -1,5 +1,6 @@
 # protopia_backend/protopia_backend/settings.py
 import os
+import re
 from pathlib import Path
 from corsheaders.defaults import default_headers
 import dj_database_url
@@ -69,13 +70,23 @@ WSGI_APPLICATION = "protopia_backend.wsgi.application"
 # ────────────────────────────────────────────────────────────────────────────────
 # Database (Railway DATABASE_URL or fallback SQLite)
 # ────────────────────────────────────────────────────────────────────────────────
+# Persistent connections (reused for 10 min, pinged before reuse after an error)
+# so requests don't pay TCP + TLS + auth to Postgres; point DATABASE_URL at
+# PgBouncer in session pooling mode for server-side pooling across workers.
+# Transaction pooling breaks the server-side cursors behind .iterator()
+# (admin_candidate_list): set PGBOUNCER_TRANSACTION_POOLING=1 to turn them off.
 DATABASES = {
     "default": dj_database_url.config(
         default=os.getenv("DATABASE_URL", f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
         conn_max_age=600,
+        conn_health_checks=True,
         ssl_require=False,
     )
 }
+if DATABASES["default"]["ENGINE"] == "django.db.backends.postgresql":
+    DATABASES["default"].setdefault("OPTIONS", {}).setdefault("connect_timeout", 5)
+    if os.getenv("PGBOUNCER_TRANSACTION_POOLING", "0") == "1":
+        DATABASES["default"]["DISABLE_SERVER_SIDE_CURSORS"] = True
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Passwords
@@ -116,6 +127,10 @@ AUTH_USER_MODEL = "accounts.User"
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
+    "DEFAULT_RENDERER_CLASSES": (
+        "protopia_backend.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
 }
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -124,20 +139,21 @@ REST_FRAMEWORK = {
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOW_CREDENTIALS = True
 
-CORS_ALLOWED_ORIGINS = [
+CORS_ALLOWED_ORIGINS = (
     "https://protopia-frontend.vercel.app",
-]
+)
 
+# Compiled once here; the production origin above is matched before any regex runs
 CORS_ALLOWED_ORIGIN_REGEXES = [
-    r"^https://.*\.vercel\.app$",
+    re.compile(r"^https://.*\.vercel\.app$"),
 ]
 
 CORS_ALLOW_HEADERS = list(default_headers) + ["Authorization", "Content-Type"]
 
-CSRF_TRUSTED_ORIGINS = [
+CSRF_TRUSTED_ORIGINS = (
     "https://protopia-frontend.vercel.app",
     "https://protopiabackend-production.up.railway.app",  # added for Django admin login
-]
+)
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Stripe
@@ -162,9 +178,46 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER)
 # ────────────────────────────────────────────────────────────────────────────────
 # Cache
 # ────────────────────────────────────────────────────────────────────────────────
-CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "protopia-email-cache",
+# Redis when available so every gunicorn worker shares one cache (email codes,
+# progress, question pools, Stripe lookups); per-process LocMem for local dev
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "protopia-email-cache",
+        }
     }
+
+# Read-through caches of DB state (flow progress, question pools) are only correct when
+# every worker sees the same invalidations; with per-process LocMem they read the DB
+SHARED_CACHE = bool(REDIS_URL)
+
+# ────────────────────────────────────────────────────────────────────────────────
+# Logging
+# ────────────────────────────────────────────────────────────────────────────────
+# App loggers write through a queue so emitting a record never waits on stderr
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "simple": {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"},
+    },
+    "handlers": {
+        "queued_console": {
+            "()": "protopia_backend.log_handlers.QueueStreamHandler",
+            "formatter": "simple",
+        },
+    },
+    "loggers": {
+        app: {"handlers": ["queued_console"], "level": os.getenv("LOG_LEVEL", "INFO"), "propagate": False}
+        for app in ("accounts", "assessments", "core", "protopia_backend", "stripe_integration")
+    },
 }
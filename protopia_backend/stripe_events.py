@@ -0,0 +1,24 @@
+import stripe
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def construct_event(payload, sig_header, secret, tolerance=stripe.Webhook.DEFAULT_TOLERANCE):
+    """
+    Same contract as stripe.Webhook.construct_event (ValueError on a bad body,
+    SignatureVerificationError on a bad or stale signature), but the verified body
+    is parsed with orjson when installed instead of json.loads + OrderedDict.
+    Pass request.body straight through; it is read once and never re-encoded.
+    """
+    if orjson is None:
+        return stripe.Webhook.construct_event(payload, sig_header, secret, tolerance)
+
+    # the signature covers the text form; older stripe releases don't decode bytes themselves
+    if isinstance(payload, (bytes, bytearray)):
+        payload = payload.decode("utf-8")
+    stripe.WebhookSignature.verify_header(payload, sig_header, secret, tolerance)
+    # orjson.JSONDecodeError subclasses ValueError, so callers' handlers still apply
+    return stripe.Event.construct_from(orjson.loads(payload), stripe.api_key)
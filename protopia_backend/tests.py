@@ -0,0 +1,37 @@
+import hashlib
+import hmac
+import time
+
+import stripe
+from django.test import SimpleTestCase
+
+from protopia_backend.stripe_events import construct_event
+
+SECRET = "whsec_test"
+BODY = b'{"id":"evt_1","object":"event","type":"invoice.payment_succeeded","data":{"object":{"id":"in_1"}}}'
+
+
+def _sign(body, timestamp):
+    sig = hmac.new(SECRET.encode(), f"{timestamp}.".encode() + body, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={sig}"
+
+
+class ConstructEventTests(SimpleTestCase):
+    def test_accepts_bytes_body(self):
+        event = construct_event(BODY, _sign(BODY, int(time.time())), SECRET)
+        self.assertEqual(event["type"], "invoice.payment_succeeded")
+        self.assertEqual(event["data"]["object"]["id"], "in_1")
+
+    def test_rejects_stale_timestamp(self):
+        stale = int(time.time()) - 30 * 24 * 60 * 60
+        with self.assertRaises(stripe.error.SignatureVerificationError):
+            construct_event(BODY, _sign(BODY, stale), SECRET)
+
+    def test_rejects_bad_signature(self):
+        with self.assertRaises(stripe.error.SignatureVerificationError):
+            construct_event(BODY, f"t={int(time.time())},v1=deadbeef", SECRET)
+
+    def test_bad_json_raises_value_error(self):
+        body = b"{not json"
+        with self.assertRaises(ValueError):
+            construct_event(body, _sign(body, int(time.time())), SECRET)
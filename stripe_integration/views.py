@@ -1,11 +1,63 @@
+import functools
+import logging
+
 import stripe
+from django.core.mail import EmailMessage
 from django.views.decorators.csrf import csrf_exempt
 from django.http import HttpResponse
 from django.conf import settings
-from django.core.mail import send_mail
+
+from protopia_backend.mail import queue_mail
+from protopia_backend.stripe_events import construct_event
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
+logger = logging.getLogger(__name__)
+
+# Resolved once; settings don't change at runtime
+_FROM_EMAIL = getattr(settings, "DEFAULT_FROM_EMAIL", None) or getattr(settings, "EMAIL_HOST_USER", None)
+
+
+def _invoice_email(invoice):
+    """The invoice summary email for the customer, or None without an address (runs on the outbox thread)."""
+    # Determine email
+    email = invoice.get("customer_email")
+    if not email:
+        cust_id = invoice.get("customer")
+        if cust_id:
+            try:
+                cust = stripe.Customer.retrieve(cust_id)
+                email = (cust or {}).get("email")
+            except Exception as e:
+                logger.warning("[Stripe] Could not retrieve customer: %s", e)
+
+    amount_paid = (invoice.get("amount_paid") or 0) / 100.0
+    currency = (invoice.get("currency") or "usd").upper()
+    number = invoice.get("number") or invoice.get("id")
+    hosted_url = invoice.get("hosted_invoice_url")
+    pdf_url = invoice.get("invoice_pdf")
+
+    subject = f"Your Protopia tax invoice — {number}"
+    lines = [
+        "Thank you for your payment.",
+        f"Amount: {amount_paid:.2f} {currency}",
+        ""
+    ]
+    if hosted_url:
+        lines.append(f"Hosted invoice: {hosted_url}")
+    if pdf_url:
+        lines.append(f"PDF invoice: {pdf_url}")
+    lines.append("")
+    lines.append("If you have any questions, reply to this email.")
+    body = "\n".join(lines)
+
+    if not email:
+        logger.info("[Stripe] No customer email on invoice; skipping email send.")
+        return None
+    logger.info("[Stripe] Sending invoice email to %s for invoice %s", email, number)
+    return EmailMessage(subject, body, _FROM_EMAIL, [email])
+
+
 @csrf_exempt
 def webhook(request):
     """
@@ -17,67 +69,23 @@ def webhook(request):
     endpoint_secret = getattr(settings, "STRIPE_WEBHOOK_SECRET", None)
 
     if not endpoint_secret:
-        print("[Stripe] Missing STRIPE_WEBHOOK_SECRET in settings.")
+        logger.error("[Stripe] Missing STRIPE_WEBHOOK_SECRET in settings.")
         return HttpResponse(status=400)
 
     try:
-        event = stripe.Webhook.construct_event(
-            payload=payload,
-            sig_header=sig_header,
-            secret=endpoint_secret
-        )
+        event = construct_event(payload, sig_header, endpoint_secret)
     except ValueError as e:
-        print(f"[Stripe] Invalid payload: {e}")
+        logger.warning("[Stripe] Invalid payload: %s", e)
         return HttpResponse(status=400)
     except stripe.error.SignatureVerificationError as e:
-        print(f"[Stripe] Invalid signature: {e}")
+        logger.warning("[Stripe] Invalid signature: %s", e)
         return HttpResponse(status=400)
 
     if event["type"] == "invoice.payment_succeeded":
         invoice = event["data"]["object"]  # type: ignore
-
-        # Determine email
-        email = invoice.get("customer_email")
-        if not email:
-            cust_id = invoice.get("customer")
-            if cust_id:
-                try:
-                    cust = stripe.Customer.retrieve(cust_id)
-                    email = (cust or {}).get("email")
-                except Exception as e:
-                    print(f"[Stripe] Could not retrieve customer: {e}")
-
-        amount_paid = (invoice.get("amount_paid") or 0) / 100.0
-        currency = (invoice.get("currency") or "usd").upper()
-        number = invoice.get("number") or invoice.get("id")
-        hosted_url = invoice.get("hosted_invoice_url")
-        pdf_url = invoice.get("invoice_pdf")
-
-        subject = f"Your Protopia tax invoice — {number}"
-        lines = [
-            "Thank you for your payment.",
-            f"Amount: {amount_paid:.2f} {currency}",
-            ""
-        ]
-        if hosted_url:
-            lines.append(f"Hosted invoice: {hosted_url}")
-        if pdf_url:
-            lines.append(f"PDF invoice: {pdf_url}")
-        lines.append("")
-        lines.append("If you have any questions, reply to this email.")
-        body = "\n".join(lines)
-
-        from_email = getattr(settings, "DEFAULT_FROM_EMAIL", getattr(settings, "EMAIL_HOST_USER", None))
-
-        if email:
-            try:
-                send_mail(subject, body, from_email, [email], fail_silently=False)
-                print(f"[Stripe] Invoice email SENT to {email} for invoice {number}")
-            except Exception as e:
-                print(f"[Stripe] Failed to send invoice email: {e}")
-        else:
-            print("[Stripe] No customer email on invoice; skipping email send.")
+        # Customer lookup + SMTP happen on the outbox thread so Stripe gets its 200 right away
+        queue_mail(functools.partial(_invoice_email, invoice))
     else:
-        print(f"[Stripe] Received event: {event['type']}")
+        logger.info("[Stripe] Received event: %s", event["type"])
 
     return HttpResponse(status=200)